@@ -1,89 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
-from collections import defaultdict
 import sqlite3
 import json
+import hashlib
 import os
-from services.github_service import fetch_public_repos
-from services.github_analyzer import analyze_repo
-max_tokens=4096
+import time
+from services import batch_evaluation, code_prescreen, evaluation_cache, llm_gateway, repo_store, roadmap_cache, roadmap_parser, scoring, timeseries
+from services import db
+from services.migrations import migrate
+from services import analysis_jobs
 from datetime import datetime
 from flask_cors import CORS
-from openai import OpenAI
-import json
 from dotenv import load_dotenv
-import json
 import re
 last_sync_time = datetime.now().strftime("%b %d, %Y %I:%M %p")
-DATABASE = "users.db"
 
 # ================= DATABASE =================
 def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def create_table():
-    conn = get_db()
-
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT,
-        email TEXT UNIQUE,
-        password TEXT,
-        github_username TEXT
-    )
-    """)
-
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repositories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        repo_url TEXT,
-        language TEXT,
-        UNIQUE(user_id, repo_url)
-    )
-    """)
-
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repo_analysis (
-        repo_id INTEGER UNIQUE,
-        documentation_score INTEGER,
-        code_quality_score INTEGER,
-        maintainability_score INTEGER,
-        developer_level TEXT,
-        strengths TEXT,
-        weaknesses TEXT,
-        improvements TEXT,
-        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS learning_roadmaps (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        skill TEXT,
-        roadmap_json TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repo_analysis_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        repo_id INTEGER,
-        documentation_score INTEGER,
-        code_quality_score INTEGER,
-        maintainability_score INTEGER,
-        developer_level TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+    # One pooled connection per app context, released on teardown
+    return db.get_db()
 
-    conn.commit()
-    conn.close()
 
 # ================= AUTH =================
 
@@ -93,22 +29,21 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 app.secret_key = os.getenv("FLASK_SECRET_KEY")
+db.init_app(app)
 
-# ✅ CREATE DB + TABLES AT APP STARTUP (RENDER SAFE)
+# ✅ APPLY SCHEMA MIGRATIONS AT APP STARTUP (RENDER SAFE)
 with app.app_context():
-    create_table()
-
-
+    migrate(get_db())
 
 
-NOVITA_API_KEY = os.getenv("NOVITA_API_KEY")
-if not NOVITA_API_KEY:
-    raise RuntimeError("NOVITA_API_KEY not set in .env")
-
-ernie_client = OpenAI(
-    api_key=NOVITA_API_KEY,
-    base_url="https://api.novita.ai/openai"
-)
+# Bump when a roadmap prompt changes so cached roadmaps are not reused
+ROADMAP_PROMPT_VERSION = "projects-v1"
+LEARNING_PROMPT_VERSION = "items-v1"
+# Same for evaluation_request; part of the evaluation cache key
+EVALUATION_PROMPT_VERSION = "2"
+EVALUATION_MODEL = "baidu/ernie-4.5-21B-a3b-thinking"
+# Browser cache lifetime for /learning/roadmaps/<id>
+ROADMAP_MAX_AGE_SECONDS = int(os.getenv("ROADMAP_MAX_AGE_SECONDS", 3600))
 
 @app.route("/learning/submit", methods=["POST"])
 def learning_submit():
@@ -139,6 +74,14 @@ def learning_roadmap():
         if not skill:
             return {"error": "Skill is required"}, 400
 
+        # ✅ SAME CANONICAL SKILL => SERVE THE SHARED ROADMAP
+        skill_key = roadmap_cache.canonical_skill(skill)
+        conn = get_db()
+        cached = roadmap_cache.lookup(conn, skill_key, ROADMAP_PROMPT_VERSION)
+        if cached is not None:
+            conn.commit()
+            return cached
+
         prompt = f"""
 You are a senior curriculum architect and industry expert.
 
@@ -204,7 +147,7 @@ Example progression (DO NOT COPY, ONLY FOLLOW QUALITY):
 Generate the FULL 10-project roadmap now.
 """
 
-        response = ernie_client.chat.completions.create(
+        content = llm_gateway.chat_text(
             model="baidu/ernie-4.5-21B-a3b-thinking",
             messages=[
                 {"role": "system", "content": "Return ONLY valid JSON. No markdown."},
@@ -214,7 +157,7 @@ Generate the FULL 10-project roadmap now.
             max_tokens=6000
         )
 
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
 
         # 🔍 DEBUG LOG (KEEP THIS)
         print("=== AI RAW OUTPUT ===")
@@ -223,16 +166,21 @@ Generate the FULL 10-project roadmap now.
 
         # ✅ STRICT JSON PARSE
         try:
-            return json.loads(content)
+            roadmap = json.loads(content)
         except json.JSONDecodeError:
-            pass
-
-        # 🔁 SAFE EXTRACTION
-        match = re.search(r"\{.*\}", content, re.S)
-        if match:
-            return json.loads(match.group())
+            # 🔁 SAFE EXTRACTION
+            match = re.search(r"\{.*\}", content, re.S)
+            if not match:
+                return {"error": "Failed to generate roadmap"}, 500
+            roadmap = json.loads(match.group())
+
+        roadmap_cache.save_roadmap(
+            conn, session.get("user_id"), skill, roadmap, "projects",
+            skill_key, ROADMAP_PROMPT_VERSION
+        )
+        conn.commit()
 
-        return {"error": "Failed to generate roadmap"}, 500
+        return roadmap
 
     except Exception as e:
         print("🔥 ROADMAP ERROR:", str(e))
@@ -256,9 +204,8 @@ def signup():
             conn.commit()
             return redirect(url_for("login"))
         except sqlite3.IntegrityError:
+            conn.rollback()
             flash("Email already exists")
-        finally:
-            conn.close()
     return render_template("register.html")
 
 
@@ -271,7 +218,6 @@ def login():
             "SELECT * FROM users WHERE email=?",
             (request.form["email"],)
         ).fetchone()
-        conn.close()
 
         if user and check_password_hash(user["password"], request.form["password"]):
             session["user_id"] = user["id"]
@@ -296,34 +242,23 @@ def dashboard():
 
     conn = get_db()
 
-    # Total users
-    total_users = conn.execute(
-        "SELECT COUNT(*) FROM users"
-    ).fetchone()[0]
-
-    # User repos
-    user_repos = conn.execute(
-        "SELECT COUNT(*) FROM repositories WHERE user_id=?",
-        (session["user_id"],)
-    ).fetchone()[0]
-
-    # Projects analyzed
-    analyzed_projects = conn.execute("""
-        SELECT COUNT(*) 
-        FROM repo_analysis a
-        JOIN repositories r ON a.repo_id = r.id
-        WHERE r.user_id=?
-    """, (session["user_id"],)).fetchone()[0]
-
-    # Average code quality
-    avg_code_quality = conn.execute("""
-        SELECT AVG(code_quality_score)
-        FROM repo_analysis a
-        JOIN repositories r ON a.repo_id = r.id
-        WHERE r.user_id=?
-    """, (session["user_id"],)).fetchone()[0]
+    # ✅ ONE QUERY: GLOBAL ROW (user_id=0) + THIS USER'S ROW
+    stats = conn.execute("""
+        SELECT g.user_count,
+               IFNULL(u.repo_count, 0) AS repo_count,
+               IFNULL(u.analyzed_count, 0) AS analyzed_count,
+               IFNULL(u.code_quality_sum, 0) AS code_quality_sum
+        FROM user_stats g
+        LEFT JOIN user_stats u ON u.user_id = ?
+        WHERE g.user_id = 0
+    """, (session["user_id"],)).fetchone()
 
-    conn.close()
+    total_users = stats["user_count"]
+    user_repos = stats["repo_count"]
+    analyzed_projects = stats["analyzed_count"]
+    avg_code_quality = (
+        stats["code_quality_sum"] / analyzed_projects if analyzed_projects else 0
+    )
 
     return render_template(
         "index.html",
@@ -342,70 +277,25 @@ def github():
     conn = get_db()
 
     if request.method == "POST":
-        repo_id = request.form.get("repo_id")
+        repo_id = request.form.get("repo_id", type=int)
 
         repo = conn.execute(
-            "SELECT repo_url FROM repositories WHERE id=? AND user_id=?",
+            "SELECT repo_url, default_branch FROM repositories WHERE id=? AND user_id=?",
             (repo_id, session["user_id"])
         ).fetchone()
 
-        if repo:
-            # ✅ RUN ANALYSIS ONLY ONCE
-            result = analyze_repo(repo["repo_url"])
-
-            # ✅ SAVE LATEST SNAPSHOT
-            conn.execute("""
-                INSERT INTO repo_analysis (
-                    repo_id,
-                    documentation_score,
-                    code_quality_score,
-                    maintainability_score,
-                    developer_level,
-                    strengths,
-                    weaknesses,
-                    improvements
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(repo_id) DO UPDATE SET
-                    documentation_score=excluded.documentation_score,
-                    code_quality_score=excluded.code_quality_score,
-                    maintainability_score=excluded.maintainability_score,
-                    developer_level=excluded.developer_level,
-                    strengths=excluded.strengths,
-                    weaknesses=excluded.weaknesses,
-                    improvements=excluded.improvements,
-                    updated_at=CURRENT_TIMESTAMP
-            """, (
-                repo_id,
-                result["documentation_score"],
-                result["code_quality_score"],
-                result["maintainability_score"],
-                result["estimated_developer_level"],
-                json.dumps(result["strengths"]),
-                json.dumps(result["weaknesses"]),
-                json.dumps(result["improvement_suggestions"])
-            ))
-
-            # ✅ SAVE HISTORY FOR LEARNING GRAPH (ONCE)
-            conn.execute("""
-                INSERT INTO repo_analysis_history (
-                    repo_id,
-                    documentation_score,
-                    code_quality_score,
-                    maintainability_score,
-                    developer_level
-                )
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                repo_id,
-                result["documentation_score"],
-                result["code_quality_score"],
-                result["maintainability_score"],
-                result["estimated_developer_level"]
-            ))
-
-            # ✅ COMMIT ONCE
-            conn.commit()
+        if not repo:
+            return {"error": "Repository not found"}, 404
+
+        # ✅ ANALYSIS RUNS IN THE JOB POOL, SNAPSHOT + HISTORY SAVED ON COMPLETION
+        job_id = analysis_jobs.enqueue_analysis(
+            session["user_id"], repo_id, repo["repo_url"], repo["default_branch"]
+        )
+        return {
+            "job_id": job_id,
+            "status": analysis_jobs.STATUS_QUEUED,
+            "status_url": url_for("github_job_status", job_id=job_id)
+        }, 202
 
     analyses = conn.execute("""
         SELECT r.id, r.repo_url, r.language, a.*
@@ -414,7 +304,6 @@ def github():
         WHERE r.user_id=?
     """, (session["user_id"],)).fetchall()
 
-    conn.close()
     return render_template(
         "github.html",
         analyses=analyses,
@@ -423,29 +312,97 @@ def github():
     )
 
 
+@app.route("/github/analyze-all", methods=["POST"])
+def github_analyze_all():
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    job_id = analysis_jobs.enqueue_bulk_analysis(session["user_id"])
+    return {
+        "job_id": job_id,
+        "status": analysis_jobs.STATUS_QUEUED,
+        "status_url": url_for("github_job_status", job_id=job_id)
+    }, 202
+
+
+@app.route("/github/jobs/<int:job_id>")
+def github_job_status(job_id):
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    job = analysis_jobs.get_job(job_id, session["user_id"])
+    if not job:
+        return {"error": "Job not found"}, 404
+
+    job.pop("result")
+    return job
+
+
+@app.route("/github/jobs/<int:job_id>/result")
+def github_job_result(job_id):
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    job = analysis_jobs.get_job(job_id, session["user_id"])
+    if not job:
+        return {"error": "Job not found"}, 404
+
+    if job["status"] == analysis_jobs.STATUS_FAILED:
+        return {"status": job["status"], "error": job["error"]}, 500
+
+    if job["status"] != analysis_jobs.STATUS_DONE:
+        return {"status": job["status"], "stage": job["stage"]}, 409
+
+    return {"status": job["status"], "result": job["result"]}
+
+
 @app.route("/github/progress/<int:repo_id>")
 def github_progress(repo_id):
     if "user_id" not in session:
         return {"error": "Unauthorized"}, 401
 
+    try:
+        params = timeseries.parse_params(request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
     conn = get_db()
-    rows = conn.execute("""
-        SELECT documentation_score,
-               code_quality_score,
-               maintainability_score,
-               created_at
-        FROM repo_analysis_history
-        WHERE repo_id=?
-        ORDER BY created_at
-    """, (repo_id,)).fetchall()
-    conn.close()
+    series = timeseries.load_series(conn, [repo_id], **params)
 
-    return {
-        "labels": [r["created_at"] for r in rows],
-        "documentation": [r["documentation_score"] for r in rows],
-        "code_quality": [r["code_quality_score"] for r in rows],
-        "maintainability": [r["maintainability_score"] for r in rows]
-    }
+    return series[repo_id]
+
+
+@app.route("/github/progress")
+def github_progress_batch():
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    try:
+        params = timeseries.parse_params(request.args)
+        repo_ids = [
+            int(i) for i in request.args.get("repo_ids", "").split(",") if i.strip()
+        ]
+    except ValueError as e:
+        return {"error": str(e) or "Invalid repo_ids"}, 400
+
+    if not repo_ids:
+        return {"error": "repo_ids is required"}, 400
+    if len(repo_ids) > timeseries.MAX_BATCH_REPOS:
+        return {"error": f"At most {timeseries.MAX_BATCH_REPOS} repos per request"}, 400
+
+    conn = get_db()
+
+    # ✅ ONLY THE CALLER'S OWN REPOS
+    placeholders = ", ".join("?" for _ in repo_ids)
+    owned = [
+        r["id"] for r in conn.execute(
+            f"SELECT id FROM repositories WHERE user_id=? AND id IN ({placeholders})",
+            (session["user_id"], *repo_ids)
+        )
+    ]
+
+    series = timeseries.load_series(conn, owned, **params) if owned else {}
+    return {"series": {str(k): v for k, v in series.items()}}
 
 @app.route("/github/improvements/<int:repo_id>")
 def github_improvements(repo_id):
@@ -458,7 +415,6 @@ def github_improvements(repo_id):
         FROM repo_analysis
         WHERE repo_id=?
     """, (repo_id,)).fetchone()
-    conn.close()
 
     if not row:
         return {"error": "No analysis found"}, 404
@@ -482,32 +438,23 @@ def github_connect():
 
     github_username = request.form["github_username"]
 
-    repos = fetch_public_repos(github_username)
     conn = get_db()
 
-    # ✅ SAVE GITHUB USERNAME
+    # ✅ FETCH FROM GITHUB BEFORE ANY WRITE (NO DB LOCK HELD MEANWHILE)
+    synced = repo_store.fetch_github_account(conn, session["user_id"], github_username)
+
+    # ✅ SAVE GITHUB USERNAME + REPOS IN ONE SHORT TRANSACTION
     conn.execute("""
         UPDATE users SET github_username=?
         WHERE id=?
     """, (github_username, session["user_id"]))
-
-    for r in repos:
-        if isinstance(r, dict):
-            repo_url = r.get("url")
-            language = r.get("language", "Unknown")
-        else:
-            repo_url = r
-            language = "Unknown"
-
-        conn.execute("""
-            INSERT OR IGNORE INTO repositories (user_id, repo_url, language)
-            VALUES (?, ?, ?)
-        """, (session["user_id"], repo_url, language))
-
+    counts = repo_store.apply_github_sync(conn, session["user_id"], github_username, synced)
     conn.commit()
-    conn.close()
 
-    flash("GitHub connected successfully")
+    flash(
+        f"GitHub connected successfully ({counts['inserted']} new, "
+        f"{counts['updated']} updated, {counts['removed']} removed)"
+    )
     return redirect(url_for("github"))
 
 @app.route("/learning")
@@ -528,86 +475,29 @@ def resume_preview():
         JOIN repo_analysis a ON r.id = a.repo_id
         WHERE r.user_id=?
     """, (session["user_id"],)).fetchall()
-    conn.close()
 
     if not analyses:
         return render_template("resume.html", analyses=[], username=session["username"])
 
-    avg_doc = sum(a["documentation_score"] for a in analyses) / len(analyses)
-    avg_code = sum(a["code_quality_score"] for a in analyses) / len(analyses)
-    avg_main = sum(a["maintainability_score"] for a in analyses) / len(analyses)
-    overall = (avg_doc + avg_code + avg_main) / 3
-
-    lang_scores = defaultdict(list)
-    for a in analyses:
-        lang_scores[a["language"]].append(
-            (a["documentation_score"] + a["code_quality_score"] + a["maintainability_score"]) / 3
-        )
-
-    language_avg = {k: round(sum(v)/len(v), 1) for k, v in lang_scores.items()}
-
-    summary = (
-        "Advanced developer" if overall >= 85
-        else "Proficient developer" if overall >= 70
-        else "Growing developer"
-    )
+    # ✅ AVERAGES + PER-LANGUAGE MEANS COMPUTED IN SQLITE
+    rollup = scoring.user_rollup(conn, session["user_id"])
 
     return render_template(
         "resume.html",
         username=session["username"],
         analyses=analyses,
-        avg_documentation=round(avg_doc, 1),
-        avg_code_quality=round(avg_code, 1),
-        avg_maintainability=round(avg_main, 1),
-        overall_score=round(overall, 1),
-        language_avg=language_avg,
-        summary=summary
+        avg_documentation=round(rollup.avg_documentation, 1),
+        avg_code_quality=round(rollup.avg_code_quality, 1),
+        avg_maintainability=round(rollup.avg_maintainability, 1),
+        overall_score=round(rollup.overall, 1),
+        language_avg=rollup.language_avg,
+        summary=scoring.resume_summary(rollup.overall)
     )
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
-from collections import defaultdict
-import sqlite3
-import json
-
-from services.github_service import fetch_public_repos
-from services.github_analyzer import analyze_repo
-max_tokens=4096
-from datetime import datetime
 
-last_sync_time = datetime.now().strftime("%b %d, %Y %I:%M %p")
-
-
-
-
-
-from openai import OpenAI
-import json
-from dotenv import load_dotenv
-import json
-import re
 
+# ---------------- LEARNING: PROMPTS ----------------
 
-
-NOVITA_API_KEY = os.getenv("NOVITA_API_KEY")
-if not NOVITA_API_KEY:
-    raise RuntimeError("NOVITA_API_KEY not set in .env")
-
-ernie_client = OpenAI(
-    api_key=NOVITA_API_KEY,
-    base_url="https://api.novita.ai/openai"
-)
-
-
-
-@app.route("/learning/generate", methods=["POST"])
-def generate_learning_path():
-    if "user_id" not in session:
-        return {"error": "Unauthorized"}, 401
-
-    skill = request.json.get("skill")
-    if not skill:
-        return {"error": "Skill is required"}, 400
-
+def learning_request(skill):
     prompt = f"""
 You are an expert curriculum designer.
 Create a professional learning roadmap for "{skill}".
@@ -625,7 +515,7 @@ RULES:
   - project_list (array of hands-on projects)
 """
 
-    response = ernie_client.chat.completions.create(
+    return dict(
         model="baidu/ernie-4.5-21B-a3b-thinking",
         messages=[
             {"role": "system", "content": "Return ONLY valid JSON."},
@@ -635,162 +525,8 @@ RULES:
         max_tokens=6000
     )
 
-    raw = response.choices[0].message.content.strip()
-
-    print("=== AI RAW OUTPUT ===")
-    print(raw)
-    print("=====================")
-
-    if not raw:
-        return {"error": "AI returned empty response"}, 500
-
-    # -------------------------------------------------
-    # 1️⃣ Remove markdown fences
-    # -------------------------------------------------
-    raw = re.sub(r"^```(?:json)?|```$", "", raw.strip(), flags=re.IGNORECASE).strip()
-
-    # -------------------------------------------------
-    # 2️⃣ Parse JSON safely
-    # -------------------------------------------------
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        match = re.search(r"(\[[\s\S]*\]|\{[\s\S]*\})", raw)
-        if not match:
-            return {"error": "Invalid AI JSON"}, 500
-        parsed = json.loads(match.group(1))
-
-    # -------------------------------------------------
-    # 3️⃣ Normalize into list (AUTO-DETECT)
-    # -------------------------------------------------
-    if isinstance(parsed, dict):
-        if "projects" in parsed:
-            roadmap_raw = parsed["projects"]
-        elif "roadmap" in parsed:
-            roadmap_raw = parsed["roadmap"]
-        else:
-            list_values = [v for v in parsed.values() if isinstance(v, list)]
-            if not list_values:
-                return {"error": "Unknown AI JSON structure"}, 500
-            roadmap_raw = list_values[0]
-    elif isinstance(parsed, list):
-        roadmap_raw = parsed
-    else:
-        return {"error": "Unexpected AI output format"}, 500
-
-    # -------------------------------------------------
-    # 4️⃣ Normalize each roadmap item (WITH project_list)
-    # -------------------------------------------------
-    roadmap = []
-
-    for item in roadmap_raw:
-        if not isinstance(item, dict):
-            continue
-
-        skills = (
-            item.get("skills")
-            or item.get("skill")
-            or item.get("technologies")
-            or item.get("tools")
-            or []
-        )
-
-        prerequisites = (
-            item.get("prerequisites")
-            or item.get("requires")
-            or item.get("depends_on")
-            or []
-        )
-
-        project_list = (
-            item.get("project_list")
-            or item.get("projects")
-            or item.get("projectList")
-            or []
-        )
-
-        # Ensure lists
-        if isinstance(skills, str):
-            skills = [skills]
-        if isinstance(prerequisites, str):
-            prerequisites = [prerequisites]
-        if isinstance(project_list, str):
-            project_list = [project_list]
-
-        # 🔥 Auto-generate projects if missing
-        if not project_list:
-            title = item.get("title", "Topic")
-            project_list = [
-                f"{title} – Mini Project",
-                f"{title} – Practical Implementation",
-                f"{title} – Real-World Use Case"
-            ]
-
-        roadmap.append({
-            "title": item.get("title", "Untitled Topic"),
-            "description": item.get("description", ""),
-            "level": item.get("level") or item.get("difficulty", "Beginner"),
-            "skills": skills,
-            "prerequisites": prerequisites,
-            "project_list": project_list
-        })
-
-    # -------------------------------------------------
-    # 5️⃣ Enforce EXACTLY 10 items
-    # -------------------------------------------------
-    if len(roadmap) != 10:
-        return {
-            "error": "AI must return exactly 10 roadmap items",
-            "received": len(roadmap)
-        }, 500
-
-    # -------------------------------------------------
-    # 6️⃣ Save to JSON file
-    # -------------------------------------------------
-    os.makedirs("static/data", exist_ok=True)
-    path = "static/data/skill.json"
-
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(roadmap, f, indent=2, ensure_ascii=False)
-
-    # -------------------------------------------------
-    # 7️⃣ Save to DB
-    # -------------------------------------------------
-    conn = get_db()
-    conn.execute("""
-        INSERT INTO learning_roadmaps (user_id, skill, roadmap_json)
-        VALUES (?, ?, ?)
-    """, (
-        session["user_id"],
-        skill,
-        json.dumps(roadmap, ensure_ascii=False)
-    ))
-    conn.commit()
-    conn.close()
-
-    # -------------------------------------------------
-    # 8️⃣ Return response
-    # -------------------------------------------------
-    return {
-        "success": True,
-        "skill": skill,
-        "roadmap_count": len(roadmap),
-        "roadmap": roadmap
-    }
-
-@app.route("/learning/evaluate", methods=["POST"])
-def learning_evaluate():
-    data = request.get_json()
-    task = data.get("task", "")
-    code = data.get("code", "")
-
-    if not code.strip():
-        return {
-            "feedback": ["No code submitted"],
-            "improved_code": "",
-            "score": 0
-        }
 
+def evaluation_request(task, code, metrics=None):
     prompt = f"""
 You are a senior Python instructor.
 
@@ -800,12 +536,16 @@ TASK:
 STUDENT CODE:
 {code}
 
+STATIC METRICS (already computed, the code parses):
+{code_prescreen.format_metrics(metrics) if metrics else "- not available"}
+
 Evaluate the code.
 
 RULES:
 - Respond ONLY with JSON
 - Wrap JSON between <json> and </json>
 - No explanation outside JSON
+- Do not restate the metrics; at most 5 short feedback items
 
 JSON FORMAT EXAMPLE:
 <json>
@@ -819,8 +559,8 @@ JSON FORMAT EXAMPLE:
 </json>
 """
 
-    response = ernie_client.chat.completions.create(
-        model="baidu/ernie-4.5-21B-a3b-thinking",
+    return dict(
+        model=EVALUATION_MODEL,
         messages=[
             {"role": "system", "content": "Return ONLY JSON inside <json> tags."},
             {"role": "user", "content": prompt}
@@ -829,15 +569,25 @@ JSON FORMAT EXAMPLE:
         max_tokens=1024
     )
 
-    content = response.choices[0].message.content
 
+def evaluation_key(task, code):
+    return evaluation_cache.make_key(task, code, EVALUATION_PROMPT_VERSION, EVALUATION_MODEL)
+
+
+def parse_evaluation(content, code, cache_key=None):
     # ✅ SAFE JSON EXTRACTION
     match = re.search(r"<json>(.*?)</json>", content, re.S)
     if match:
         try:
-            return json.loads(match.group(1))
+            result = json.loads(match.group(1))
         except json.JSONDecodeError:
-            pass
+            result = None
+
+        # ✅ ONLY REAL MODEL ANSWERS ARE CACHED
+        if isinstance(result, dict):
+            if cache_key:
+                evaluation_cache.put(cache_key, result)
+            return result
 
     # ✅ FINAL FALLBACK (ONLY IF AI TOTALLY FAILS)
     return {
@@ -850,71 +600,286 @@ JSON FORMAT EXAMPLE:
         "score": 100
     }
 
-# ================= DATABASE =================
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
 
+def store_learning_roadmap(conn, skill, skill_key, roadmap):
+    # DB only: roadmaps are served per user from /learning/roadmaps/<id>;
+    # file copies come from services.roadmap_export, never the request path
+    roadmap_id = roadmap_cache.save_roadmap(
+        conn, session["user_id"], skill, roadmap, "items",
+        skill_key, LEARNING_PROMPT_VERSION
+    )
+    conn.commit()
+    return roadmap_id
+
+# ---------------- LEARNING: STREAMING ----------------
 
-def create_table():
-    conn = get_db()
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT,
-        email TEXT UNIQUE,
-        password TEXT,
-        github_username TEXT
-    )
-    """)
 
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repositories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        repo_url TEXT,
-        language TEXT,
-        UNIQUE(user_id, repo_url)
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    """)
 
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repo_analysis (
-        repo_id INTEGER UNIQUE,
-        documentation_score INTEGER,
-        code_quality_score INTEGER,
-        maintainability_score INTEGER,
-        developer_level TEXT,
-        strengths TEXT,
-        weaknesses TEXT,
-        improvements TEXT,
-        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
 
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS repo_analysis_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        repo_id INTEGER,
-        documentation_score INTEGER,
-        code_quality_score INTEGER,
-        maintainability_score INTEGER,
-        developer_level TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+@app.route("/learning/generate", methods=["POST"])
+def generate_learning_path():
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
 
-    conn.commit()
-    conn.close()
+    skill = request.json.get("skill")
+    if not skill:
+        return {"error": "Skill is required"}, 400
+
+    # ✅ SAME CANONICAL SKILL => SERVE THE SHARED ROADMAP
+    skill_key = roadmap_cache.canonical_skill(skill)
+    conn = get_db()
+    roadmap = roadmap_cache.lookup(conn, skill_key, LEARNING_PROMPT_VERSION)
+    if roadmap is not None:
+        roadmap_id = roadmap_cache.save_roadmap(conn, session["user_id"], skill, roadmap, "items")
+        conn.commit()
+        return {
+            "success": True,
+            "skill": skill,
+            "roadmap_id": roadmap_id,
+            "roadmap_count": len(roadmap),
+            "roadmap": roadmap,
+            "cached": True
+        }
 
+    content = llm_gateway.chat_text(**learning_request(skill))
 
+    raw = content.strip()
 
+    print("=== AI RAW OUTPUT ===")
+    print(raw)
+    print("=====================")
 
+    if not raw:
+        return {"error": "AI returned empty response"}, 500
 
+    # -------------------------------------------------
+    # 1️⃣ Parse + normalize roadmap items
+    # -------------------------------------------------
+    try:
+        roadmap = roadmap_parser.parse_roadmap(raw)
+    except ValueError as e:
+        return {"error": str(e)}, 500
 
+    # -------------------------------------------------
+    # 2️⃣ Enforce EXACTLY 10 items
+    # -------------------------------------------------
+    if len(roadmap) != roadmap_parser.ROADMAP_ITEMS:
+        return {
+            "error": "AI must return exactly 10 roadmap items",
+            "received": len(roadmap)
+        }, 500
 
+    # -------------------------------------------------
+    # 3️⃣ Save to DB
+    # -------------------------------------------------
+    roadmap_id = store_learning_roadmap(conn, skill, skill_key, roadmap)
+
+    # -------------------------------------------------
+    # 4️⃣ Return response
+    # -------------------------------------------------
+    return {
+        "success": True,
+        "skill": skill,
+        "roadmap_id": roadmap_id,
+        "roadmap_count": len(roadmap),
+        "roadmap": roadmap
+    }
+
+@app.route("/learning/generate/stream", methods=["POST"])
+def generate_learning_path_stream():
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    skill = request.json.get("skill")
+    if not skill:
+        return {"error": "Skill is required"}, 400
+
+    skill_key = roadmap_cache.canonical_skill(skill)
+    conn = get_db()
+
+    def events():
+        # ✅ SHARED ROADMAP => REPLAY IT AS ITEMS
+        cached = roadmap_cache.lookup(conn, skill_key, LEARNING_PROMPT_VERSION)
+        if cached is not None:
+            roadmap_id = roadmap_cache.save_roadmap(conn, session["user_id"], skill, cached, "items")
+            conn.commit()
+            for i, item in enumerate(cached):
+                yield sse("item", {"index": i, "item": item})
+            yield sse("done", {
+                "success": True, "skill": skill, "roadmap_id": roadmap_id,
+                "roadmap_count": len(cached), "cached": True
+            })
+            return
+
+        parser = roadmap_parser.ItemStream()
+        roadmap = []
+
+        try:
+            for text in llm_gateway.chat_stream_shared(**learning_request(skill)):
+                if not text:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield sse("token", {"text": text})
+                for item in parser.feed(text):
+                    yield sse("item", {"index": len(roadmap), "item": item})
+                    roadmap.append(item)
+        except Exception as e:
+            print("❌ Roadmap stream failed:", e)
+            yield sse("error", {"error": "AI request failed"})
+            return
+
+        # Items the incremental parser missed (malformed chunks): reparse once
+        if len(roadmap) != roadmap_parser.ROADMAP_ITEMS:
+            try:
+                roadmap = roadmap_parser.parse_roadmap(parser.text())
+            except ValueError as e:
+                yield sse("error", {"error": str(e)})
+                return
+
+        if len(roadmap) != roadmap_parser.ROADMAP_ITEMS:
+            yield sse("error", {
+                "error": "AI must return exactly 10 roadmap items",
+                "received": len(roadmap)
+            })
+            return
+
+        roadmap_id = store_learning_roadmap(conn, skill, skill_key, roadmap)
+        yield sse("done", {
+            "success": True, "skill": skill, "roadmap_id": roadmap_id,
+            "roadmap_count": len(roadmap), "roadmap": roadmap
+        })
+
+    return sse_response(events())
+
+@app.route("/learning/evaluate", methods=["POST"])
+def learning_evaluate():
+    data = request.get_json()
+    task = data.get("task", "")
+    code = data.get("code", "")
+
+    # ✅ EMPTY / OVERSIZED / UNPARSABLE CODE IS ANSWERED LOCALLY
+    screen = code_prescreen.prescreen(code)
+    if screen["result"] is not None:
+        return screen["result"]
+
+    # ✅ SAME TASK + SAME CODE (MODULO COMMENTS/FORMATTING) => CACHED RESULT
+    cache_key = evaluation_key(task, code)
+    cached = evaluation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    content = llm_gateway.chat_text(**evaluation_request(task, code, screen["metrics"]))
+    return parse_evaluation(content, code, cache_key)
+
+@app.route("/learning/evaluate/stream", methods=["POST"])
+def learning_evaluate_stream():
+    data = request.get_json()
+    task = data.get("task", "")
+    code = data.get("code", "")
+
+    def events():
+        screen = code_prescreen.prescreen(code)
+        if screen["result"] is not None:
+            yield sse("result", screen["result"])
+            return
+
+        cache_key = evaluation_key(task, code)
+        cached = evaluation_cache.get(cache_key)
+        if cached is not None:
+            yield sse("result", cached)
+            return
+
+        content = []
+        try:
+            for text in llm_gateway.chat_stream(**evaluation_request(task, code, screen["metrics"])):
+                if not text:
+                    yield ": keep-alive\n\n"
+                    continue
+                content.append(text)
+                yield sse("token", {"text": text})
+        except Exception as e:
+            print("❌ Evaluation stream failed:", e)
+            yield sse("error", {"error": "AI request failed"})
+            return
+
+        yield sse("result", parse_evaluation("".join(content), code, cache_key))
+
+    return sse_response(events())
+
+@app.route("/learning/evaluate/batch", methods=["POST"])
+def learning_evaluate_batch():
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    submissions = (request.get_json() or {}).get("submissions")
+    if not isinstance(submissions, list) or not submissions:
+        return {"error": "submissions must be a non-empty list"}, 400
+    if len(submissions) > batch_evaluation.MAX_BATCH_ITEMS:
+        return {"error": f"At most {batch_evaluation.MAX_BATCH_ITEMS} submissions per batch"}, 400
+
+    def evaluate_one(item):
+        content = llm_gateway.chat_text(
+            **evaluation_request(item["task"], item["code"], item["metrics"])
+        )
+        return parse_evaluation(content, item["code"], item["cache_key"])
+
+    def events():
+        start = time.perf_counter()
+        stats = {"total": len(submissions), "local": 0, "cached": 0, "model": 0, "failed": 0}
+        remote = []
+
+        # ✅ LOCAL ANSWERS + CACHE HITS GO OUT IMMEDIATELY
+        for i, sub in enumerate(submissions):
+            sub = sub if isinstance(sub, dict) else {}
+            task = str(sub.get("task", ""))
+            code = str(sub.get("code", ""))
+            result = {"index": i, "id": sub.get("id")}
+
+            screen = code_prescreen.prescreen(code)
+            if screen["result"] is not None:
+                stats["local"] += 1
+                yield sse("result", dict(result, result=screen["result"]))
+                continue
+
+            # ✅ SINGLE-PROMPT ANSWERS FIRST, THEN EARLIER PACKED ANSWERS
+            cache_key = evaluation_key(task, code)
+            packed_cache_key = batch_evaluation.packed_key(task, code, EVALUATION_MODEL)
+            cached = evaluation_cache.get(cache_key, packed_cache_key)
+            if cached is not None:
+                stats["cached"] += 1
+                yield sse("result", dict(result, result=cached, cached=True))
+                continue
+
+            remote.append({
+                "index": i, "id": sub.get("id"), "task": task, "code": code,
+                "metrics": screen["metrics"], "cache_key": cache_key,
+                "packed_cache_key": packed_cache_key
+            })
+
+        # ✅ THE REST: PACKED + CONCURRENT, STREAMED AS EACH CALL FINISHES
+        for item, evaluation in batch_evaluation.run(remote, EVALUATION_MODEL, evaluate_one):
+            result = {"index": item["index"], "id": item["id"]}
+            if evaluation is None:
+                stats["failed"] += 1
+                yield sse("result", dict(result, error="AI request failed"))
+            else:
+                stats["model"] += 1
+                yield sse("result", dict(result, result=evaluation))
+
+        stats["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+        yield sse("done", stats)
+
+    return sse_response(events())
 
 @app.route("/github/refresh", methods=["POST"])
 def github_refresh():
@@ -928,32 +893,16 @@ def github_refresh():
     """, (session["user_id"],)).fetchone()
 
     if not user or not user["github_username"]:
-        conn.close()
         return {
             "success": False,
             "message": "GitHub account not connected yet"
         }
 
     github_username = user["github_username"]
-    repos = fetch_public_repos(github_username)
-
-    for r in repos:
-        if isinstance(r, dict):
-            repo_url = r.get("url")
-            language = r.get("language", "Unknown")
-        else:
-            repo_url = r
-            language = "Unknown"
-
-        conn.execute("""
-            INSERT OR IGNORE INTO repositories (user_id, repo_url, language)
-            VALUES (?, ?, ?)
-        """, (session["user_id"], repo_url, language))
-
+    counts = repo_store.sync_github_account(conn, session["user_id"], github_username)
     conn.commit()
-    conn.close()
 
-    return {"success": True}
+    return {"success": True, **counts}
 
 
 
@@ -979,19 +928,18 @@ def profile():
     """, (session["user_id"],)).fetchall()
 
     # ANALYZED COUNT (for stats)
-    analyzed_count = conn.execute("""
-        SELECT COUNT(*)
-        FROM repositories r
-        JOIN repo_analysis a ON r.id = a.repo_id
-        WHERE r.user_id=?
-    """, (session["user_id"],)).fetchone()[0]
+    stats = conn.execute(
+        "SELECT analyzed_count FROM user_stats WHERE user_id=?",
+        (session["user_id"],)
+    ).fetchone()
+    analyzed_count = stats["analyzed_count"] if stats else 0
 
-    conn.close()
 
     return render_template(
         "profile.html",
         analyses=repos,
         analyzed_count=analyzed_count,
+        max_batch_repos=timeseries.MAX_BATCH_REPOS,
         username=session.get("username")
     )
 
@@ -1001,44 +949,17 @@ def profile_summary():
         return {"error": "Unauthorized"}, 401
 
     conn = get_db()
-    rows = conn.execute("""
-        SELECT r.id,
-            r.repo_url,
-            r.language,
-            a.documentation_score,
-            a.code_quality_score,
-            a.maintainability_score,
-            a.developer_level
-        FROM repositories r
-        JOIN repo_analysis a ON r.id = a.repo_id
-        WHERE r.user_id=?
-    """, (session["user_id"],)).fetchall()
-
-    conn.close()
+    rollup = scoring.user_rollup(conn, session["user_id"])
 
-    if not rows:
+    if not rollup.repo_count:
         return {
             "growth": "No data",
             "languages": []
         }
 
-    # ---------- CALCULATIONS ----------
-    avg = sum(
-        (r["documentation_score"] + r["code_quality_score"] + r["maintainability_score"]) / 3
-        for r in rows
-    ) / len(rows)
-
-    growth = (
-        "🚀 Strong Upward Trend" if avg >= 80
-        else "📈 Steady Improvement" if avg >= 65
-        else "🌱 Learning Phase"
-    )
-
-    languages = sorted({r["language"] for r in rows if r["language"]})
-
     return {
-        "growth": growth,
-        "languages": languages
+        "growth": scoring.growth_label(rollup.overall),
+        "languages": rollup.languages
     }
 
 @app.route("/learning/current")
@@ -1050,17 +971,37 @@ def get_current_roadmap():
     row = conn.execute("""
         SELECT roadmap_json
         FROM learning_roadmaps
-        WHERE user_id=?
+        WHERE user_id=? AND IFNULL(kind, 'items') = 'items'
         ORDER BY created_at DESC
         LIMIT 1
     """, (session["user_id"],)).fetchone()
-    conn.close()
 
     if not row:
         return {"roadmap": None}
 
     return json.loads(row["roadmap_json"])
 
+@app.route("/learning/roadmaps/<int:roadmap_id>")
+def get_roadmap(roadmap_id):
+    if "user_id" not in session:
+        return {"error": "Unauthorized"}, 401
+
+    conn = get_db()
+    row = conn.execute("""
+        SELECT roadmap_json
+        FROM learning_roadmaps
+        WHERE id=? AND user_id=?
+    """, (roadmap_id, session["user_id"])).fetchone()
+
+    if not row:
+        return {"error": "Roadmap not found"}, 404
+
+    # ✅ ROWS NEVER CHANGE: STORED JSON IS SENT AS-IS, REVALIDATED BY ETAG
+    response = Response(row["roadmap_json"], mimetype="application/json")
+    response.set_etag(hashlib.sha256(row["roadmap_json"].encode("utf-8")).hexdigest())
+    response.headers["Cache-Control"] = f"private, max-age={ROADMAP_MAX_AGE_SECONDS}"
+    return response.make_conditional(request)
+
 if __name__ == "__main__":
 
     app.run(debug=True)
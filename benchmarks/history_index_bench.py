@@ -0,0 +1,163 @@
+# Query-plan and latency comparison for the analytics indexes (migration 3).
+#
+#   python benchmarks/history_index_bench.py [history_rows]
+#
+# Seeds a throwaway database at schema v2 (no secondary indexes), times the
+# hot queries, applies the remaining migrations and times them again.
+
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.migrations import migrate
+
+# ---------------- CONSTANTS ----------------
+HISTORY_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = 2_000
+REPOS = 10_000
+ROADMAP_ROWS = 100_000
+QUERY_RUNS = 200
+BATCH = 50_000
+
+QUERIES = {
+    "github_progress": (
+        """
+        SELECT documentation_score, code_quality_score,
+               maintainability_score, created_at
+        FROM repo_analysis_history
+        WHERE repo_id=?
+        ORDER BY created_at
+        """,
+        lambda: (random.randint(1, REPOS),)
+    ),
+    "learning_current": (
+        """
+        SELECT roadmap_json
+        FROM learning_roadmaps
+        WHERE user_id=?
+        ORDER BY created_at DESC
+        LIMIT 1
+        """,
+        lambda: (random.randint(1, USERS),)
+    ),
+    "user_repositories": (
+        """
+        SELECT r.id, r.repo_url, r.language, a.code_quality_score
+        FROM repositories r
+        LEFT JOIN repo_analysis a ON r.id = a.repo_id
+        WHERE r.user_id=?
+        """,
+        lambda: (random.randint(1, USERS),)
+    )
+}
+
+# ---------------- HELPERS ----------------
+
+def seed(conn):
+    start = datetime(2024, 1, 1)
+
+    conn.executemany(
+        "INSERT INTO repositories (user_id, repo_url, language) VALUES (?, ?, ?)",
+        [
+            (i % USERS + 1, f"https://github.com/u{i % USERS}/r{i}", random.choice(["Python", "Go", "Rust"]))
+            for i in range(REPOS)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO repo_analysis (repo_id, code_quality_score) VALUES (?, ?)",
+        [(i + 1, random.randint(0, 100)) for i in range(0, REPOS, 2)]
+    )
+
+    for offset in range(0, HISTORY_ROWS, BATCH):
+        conn.executemany("""
+            INSERT INTO repo_analysis_history (
+                repo_id, documentation_score, code_quality_score,
+                maintainability_score, developer_level, created_at
+            )
+            VALUES (?, ?, ?, ?, 'intermediate', ?)
+        """, [
+            (
+                random.randint(1, REPOS),
+                random.randint(0, 100),
+                random.randint(0, 100),
+                random.randint(0, 100),
+                (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+            )
+            for i in range(offset, min(offset + BATCH, HISTORY_ROWS))
+        ])
+
+    conn.executemany(
+        "INSERT INTO learning_roadmaps (user_id, skill, roadmap_json, created_at) VALUES (?, ?, ?, ?)",
+        [
+            (
+                random.randint(1, USERS),
+                "Python",
+                "[]",
+                (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+            )
+            for i in range(ROADMAP_ROWS)
+        ]
+    )
+    conn.commit()
+
+
+def measure(conn):
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params())]
+
+        timings = []
+        for _ in range(QUERY_RUNS):
+            t0 = time.perf_counter()
+            conn.execute(sql, params()).fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        timings.sort()
+        results[name] = {
+            "plan": plan,
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[int(len(timings) * 0.95) - 1]
+        }
+    return results
+
+# ---------------- MAIN ----------------
+
+def main():
+    random.seed(42)
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+
+    migrate(conn, target=2)
+    t0 = time.perf_counter()
+    seed(conn)
+    print(f"Seeded {HISTORY_ROWS:,} history rows in {time.perf_counter() - t0:.1f}s")
+
+    before = measure(conn)
+
+    t0 = time.perf_counter()
+    migrate(conn)
+    print(f"Index migration took {time.perf_counter() - t0:.1f}s")
+
+    conn.execute("ANALYZE")
+    after = measure(conn)
+
+    for name in QUERIES:
+        print(f"\n== {name} ==")
+        for label, res in (("before", before[name]), ("after", after[name])):
+            print(f"  {label:6} median {res['median_ms']:8.3f} ms   p95 {res['p95_ms']:8.3f} ms")
+            for step in res["plan"]:
+                print(f"           plan: {step}")
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Micro-benchmark for roadmap parsing (services/roadmap_parser.py).
+#
+#   python benchmarks/roadmap_parse_bench.py [corpus_dir]
+#
+# corpus_dir holds one raw model output per *.txt file, e.g. copied from the
+# "=== AI RAW OUTPUT ===" log blocks. Without it a synthetic corpus covering
+# the shapes seen in those logs is used (fences, wrapper objects, prose,
+# alias keys, truncated output). Each output is parsed with the previous
+# regex + json.loads + `or`-chain implementation and with the current
+# module, and fed in small chunks through ItemStream.
+
+import glob
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import roadmap_parser
+
+# ---------------- CONSTANTS ----------------
+RUNS = 200
+STREAM_CHUNK_CHARS = 6
+
+# ---------------- PREVIOUS IMPLEMENTATION ----------------
+
+def legacy_parse(raw):
+    raw = re.sub(r"^```(?:json)?|```$", "", raw.strip(), flags=re.IGNORECASE).strip()
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError:
+        match = re.search(r"(\[[\s\S]*\]|\{[\s\S]*\})", raw)
+        if not match:
+            raise ValueError("Invalid AI JSON")
+        try:
+            parsed = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            raise ValueError("Invalid AI JSON")
+
+    if isinstance(parsed, dict):
+        if "projects" in parsed:
+            roadmap_raw = parsed["projects"]
+        elif "roadmap" in parsed:
+            roadmap_raw = parsed["roadmap"]
+        else:
+            list_values = [v for v in parsed.values() if isinstance(v, list)]
+            if not list_values:
+                raise ValueError("Unknown AI JSON structure")
+            roadmap_raw = list_values[0]
+    elif isinstance(parsed, list):
+        roadmap_raw = parsed
+    else:
+        raise ValueError("Unexpected AI output format")
+
+    roadmap = []
+    for item in roadmap_raw:
+        if not isinstance(item, dict):
+            continue
+        skills = item.get("skills") or item.get("skill") or item.get("technologies") or item.get("tools") or []
+        prerequisites = item.get("prerequisites") or item.get("requires") or item.get("depends_on") or []
+        project_list = item.get("project_list") or item.get("projects") or item.get("projectList") or []
+        if isinstance(skills, str):
+            skills = [skills]
+        if isinstance(prerequisites, str):
+            prerequisites = [prerequisites]
+        if isinstance(project_list, str):
+            project_list = [project_list]
+        if not project_list:
+            title = item.get("title", "Topic")
+            project_list = [
+                f"{title} – Mini Project",
+                f"{title} – Practical Implementation",
+                f"{title} – Real-World Use Case"
+            ]
+        roadmap.append({
+            "title": item.get("title", "Untitled Topic"),
+            "description": item.get("description", ""),
+            "level": item.get("level") or item.get("difficulty", "Beginner"),
+            "skills": skills,
+            "prerequisites": prerequisites,
+            "project_list": project_list
+        })
+    return roadmap
+
+# ---------------- CORPUS ----------------
+
+def synthetic_item(i, aliased):
+    item = {
+        "title": f"Stage {i + 1}: topic {i}",
+        "description": " ".join(random.choice(["build", "learn", "the", "core", "API", "{", "}", "\"q\""]) for _ in range(60)),
+        "level": random.choice(["Beginner", "Intermediate", "Advanced"]),
+        "skills": [f"skill-{i}-{k}" for k in range(5)],
+        "prerequisites": [f"Stage {i}"] if i else [],
+        "project_list": [f"Project {i}-{k}" for k in range(3)],
+    }
+    if aliased:
+        item["technologies"] = item.pop("skills")
+        item["difficulty"] = item.pop("level")
+        item["projects"] = item.pop("project_list")
+    return item
+
+
+def synthetic_corpus():
+    random.seed(7)
+    corpus = {}
+    for n, shape in enumerate(["array", "fenced", "roadmap", "projects", "prose", "aliased", "truncated"] * 6):
+        items = [synthetic_item(i, shape == "aliased") for i in range(10)]
+        body = json.dumps({"roadmap": items} if shape == "roadmap" else
+                          {"skill": "x", "projects": items} if shape == "projects" else items, indent=2)
+        if shape == "fenced":
+            body = f"```json\n{body}\n```"
+        if shape == "prose":
+            body = f"Here is your roadmap:\n{body}\nGood luck [and have fun]!"
+        if shape == "truncated":
+            body = body[:int(len(body) * 0.83)]
+        corpus[f"{shape}-{n}"] = body
+    return corpus
+
+
+def load_corpus(directory):
+    return {
+        os.path.basename(path): open(path, encoding="utf-8").read()
+        for path in sorted(glob.glob(os.path.join(directory, "*.txt")))
+    }
+
+# ---------------- HELPERS ----------------
+
+def timed(fn, raw):
+    timings = []
+    result = None
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        try:
+            result = fn(raw)
+        except ValueError:
+            result = None
+        timings.append((time.perf_counter() - t0) * 1e6)
+    return result, statistics.median(timings)
+
+
+def stream(raw):
+    parser = roadmap_parser.ItemStream()
+    items = []
+    for i in range(0, len(raw), STREAM_CHUNK_CHARS):
+        items += parser.feed(raw[i:i + STREAM_CHUNK_CHARS])
+    return items
+
+# ---------------- MAIN ----------------
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    print(f"{len(corpus)} outputs, {sum(map(len, corpus.values())):,} chars, {RUNS} runs each\n")
+    print(f"{'output':28} {'legacy µs':>10} {'items':>6} {'new µs':>10} {'items':>6} {'stream µs':>10} {'items':>6}")
+
+    totals = {"legacy": 0.0, "new": 0.0, "stream": 0.0}
+    recovered = {"legacy": 0, "new": 0, "stream": 0}
+    for name, raw in corpus.items():
+        row = []
+        for label, fn in (("legacy", legacy_parse), ("new", roadmap_parser.parse_roadmap), ("stream", stream)):
+            result, median = timed(fn, raw)
+            totals[label] += median
+            recovered[label] += len(result or [])
+            row += [median, len(result or [])]
+        print(f"{name[:28]:28} {row[0]:10.1f} {row[1]:6} {row[2]:10.1f} {row[3]:6} {row[4]:10.1f} {row[5]:6}")
+
+    print()
+    for label in totals:
+        print(f"{label:7} total median {totals[label]:10.1f} µs   items recovered {recovered[label]}")
+
+
+if __name__ == "__main__":
+    main()
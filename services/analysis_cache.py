@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import time
+
+from services.db import pooled
+
+# ---------------- CONSTANTS ----------------
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 5000))
+
+# ---------------- HELPERS ----------------
+
+def make_key(repo, commit_sha, prompt_version, model):
+    raw = "\0".join([repo.lower(), commit_sha, prompt_version, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def evict(conn):
+    now = time.time()
+
+    conn.execute(
+        "DELETE FROM analysis_cache WHERE created_at < ?",
+        (now - CACHE_TTL_SECONDS,)
+    )
+
+    # Least recently used entries go first once the cap is exceeded
+    conn.execute("""
+        DELETE FROM analysis_cache
+        WHERE cache_key NOT IN (
+            SELECT cache_key FROM analysis_cache
+            ORDER BY last_used_at DESC
+            LIMIT ?
+        )
+    """, (CACHE_MAX_ENTRIES,))
+
+# ---------------- MAIN API ----------------
+
+def get(cache_key):
+    with pooled() as conn:
+        row = conn.execute("""
+            SELECT result_json, created_at
+            FROM analysis_cache
+            WHERE cache_key=?
+        """, (cache_key,)).fetchone()
+
+        if not row:
+            return None
+
+        now = time.time()
+        if now - row["created_at"] > CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM analysis_cache WHERE cache_key=?", (cache_key,))
+            conn.commit()
+            return None
+
+        conn.execute("""
+            UPDATE analysis_cache
+            SET last_used_at=?, hits=hits + 1
+            WHERE cache_key=?
+        """, (now, cache_key))
+        conn.commit()
+
+        return json.loads(row["result_json"])
+
+
+def put(cache_key, repo, commit_sha, prompt_version, model, result):
+    now = time.time()
+    with pooled() as conn:
+        conn.execute("""
+            INSERT INTO analysis_cache (
+                cache_key, repo, commit_sha, prompt_version, model,
+                result_json, created_at, last_used_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                result_json=excluded.result_json,
+                created_at=excluded.created_at,
+                last_used_at=excluded.last_used_at
+        """, (
+            cache_key,
+            repo.lower(),
+            commit_sha,
+            prompt_version,
+            model,
+            json.dumps(result),
+            now,
+            now
+        ))
+        evict(conn)
+        conn.commit()
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.bulk_analysis import analyze_all
+from services.db import pooled
+from services.github_analyzer import analyze_repo
+from services.repo_store import save_analysis
+
+# ---------------- CONSTANTS ----------------
+JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", 4))
+# Jobs run in-process; one that stops reporting for this long was lost
+# with its worker (restart, crash) and is reported as failed
+JOB_STALE_SECONDS = int(os.getenv("ANALYSIS_JOB_STALE_SECONDS", 15 * 60))
+# Queued jobs only wait for a free worker, which can take as long as the
+# bulk jobs ahead of them; past this they were lost with their process
+JOB_QUEUE_STALE_SECONDS = int(os.getenv("ANALYSIS_JOB_QUEUE_STALE_SECONDS", 6 * 3600))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="analysis-job")
+
+# ---------------- JOB TABLE ----------------
+
+def create_job(user_id, kind, repo_id=None):
+    now = time.time()
+    with pooled() as conn:
+        cur = conn.execute("""
+            INSERT INTO analysis_jobs (user_id, repo_id, kind, status, stage, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, repo_id, kind, STATUS_QUEUED, STATUS_QUEUED, now, now))
+        conn.commit()
+        return cur.lastrowid
+
+
+def update_job(job_id, **fields):
+    # Only while running: a job get_job already failed as stale stays failed
+    # when its thread reports back late
+    fields["updated_at"] = time.time()
+    columns = ", ".join(f"{k}=?" for k in fields)
+    with pooled() as conn:
+        conn.execute(
+            f"UPDATE analysis_jobs SET {columns} WHERE id=? AND status=?",
+            (*fields.values(), job_id, STATUS_RUNNING)
+        )
+        conn.commit()
+
+
+def claim_job(job_id):
+    # queued -> running exactly once; a job already failed (reported stale)
+    # or claimed elsewhere is left alone
+    now = time.time()
+    with pooled() as conn:
+        claimed = conn.execute("""
+            UPDATE analysis_jobs SET status=?, stage=?, updated_at=?
+            WHERE id=? AND status=?
+        """, (STATUS_RUNNING, "starting", now, job_id, STATUS_QUEUED)).rowcount == 1
+        conn.commit()
+    return claimed
+
+
+def mark_stale(job):
+    # Only fails the job if it has not moved since it was read
+    with pooled() as conn:
+        conn.execute("""
+            UPDATE analysis_jobs SET status=?, stage=?, error=?, updated_at=?
+            WHERE id=? AND status=? AND updated_at=?
+        """, (
+            STATUS_FAILED, STATUS_FAILED, "Job was interrupted", time.time(),
+            job["id"], job["status"], job["updated_at"]
+        ))
+        conn.commit()
+
+
+def get_job(job_id, user_id):
+    with pooled() as conn:
+        row = conn.execute(
+            "SELECT * FROM analysis_jobs WHERE id=? AND user_id=?",
+            (job_id, user_id)
+        ).fetchone()
+
+    if not row:
+        return None
+
+    job = dict(row)
+    limit = {
+        STATUS_RUNNING: JOB_STALE_SECONDS,
+        STATUS_QUEUED: JOB_QUEUE_STALE_SECONDS,
+    }.get(job["status"])
+    if limit is not None and time.time() - job["updated_at"] > limit:
+        mark_stale(job)
+        job.update(status=STATUS_FAILED, stage=STATUS_FAILED, error="Job was interrupted")
+
+    job["result"] = json.loads(job.pop("result_json") or "null")
+    return job
+
+# ---------------- WORKER POOL ----------------
+
+def run_job(job_id, task):
+    if not claim_job(job_id):
+        return
+
+    try:
+        result = task(lambda stage: update_job(job_id, stage=stage))
+    except Exception as e:
+        print("🔥 ANALYSIS JOB ERROR:", job_id, str(e))
+        update_job(job_id, status=STATUS_FAILED, stage=STATUS_FAILED, error=str(e))
+        return
+
+    update_job(
+        job_id,
+        status=STATUS_DONE,
+        stage=STATUS_DONE,
+        result_json=json.dumps(result)
+    )
+
+
+def submit(job_id, task):
+    _executor.submit(run_job, job_id, task)
+
+# ---------------- MAIN API ----------------
+
+def enqueue_analysis(user_id, repo_id, repo_url, default_branch=None):
+    job_id = create_job(user_id, "analyze", repo_id)
+
+    def task(set_stage):
+        result = analyze_repo(repo_url, default_branch, on_stage=set_stage)
+
+        set_stage("saving")
+        with pooled() as conn:
+            save_analysis(conn, repo_id, result)
+            conn.commit()
+
+        return result
+
+    submit(job_id, task)
+    return job_id
+
+
+def enqueue_bulk_analysis(user_id):
+    job_id = create_job(user_id, "analyze_all")
+    submit(job_id, lambda set_stage: analyze_all(user_id, on_stage=set_stage))
+    return job_id
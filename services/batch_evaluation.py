@@ -0,0 +1,166 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services import code_prescreen, evaluation_cache, llm_gateway, prompt_budget
+
+# ---------------- CONSTANTS ----------------
+MAX_BATCH_ITEMS = int(os.getenv("BATCH_EVAL_MAX_ITEMS", 500))
+# Model calls in flight for one batch; the gateway still caps per model
+CONCURRENCY = int(os.getenv("BATCH_EVAL_CONCURRENCY", 4))
+# Small submissions share one call, up to this many per call
+PACK_MAX_ITEMS = int(os.getenv("BATCH_EVAL_PACK_ITEMS", 5))
+# A submission above this share of the input budget always goes alone
+PACK_MAX_SHARE = 0.5
+# Output reserved per packed submission, plus room for the thinking phase
+OUTPUT_TOKENS_PER_ITEM = 300
+THINKING_TOKENS = 512
+MAX_OUTPUT_TOKENS = 4096
+# Cache version of packed answers, kept apart from single-prompt answers;
+# bump when PACKED_TEMPLATE or the per-item output budget changes
+PACKED_PROMPT_VERSION = "packed-1"
+
+PACKED_TEMPLATE = """
+You are a senior Python instructor grading several independent submissions.
+
+{submissions}
+
+Evaluate EACH submission separately.
+
+RULES:
+- Respond ONLY with JSON
+- Wrap JSON between <json> and </json>
+- One object per submission, same ids as above
+- Do not restate the metrics; at most 5 short feedback items each
+
+JSON FORMAT EXAMPLE:
+<json>
+[
+  {{"id": 0, "feedback": ["Clear and correct solution"], "improved_code": "...", "score": 95}}
+]
+</json>
+"""
+
+# ---------------- PACKING ----------------
+
+def packed_key(task, code, model):
+    return evaluation_cache.make_key(task, code, PACKED_PROMPT_VERSION, model)
+
+
+def section(item):
+    metrics = code_prescreen.format_metrics(item["metrics"]) if item["metrics"] else "- not available"
+    return (
+        f"=== SUBMISSION id={item['index']} ===\n"
+        f"TASK:\n{item['task']}\n\n"
+        f"STUDENT CODE:\n{item['code']}\n\n"
+        f"STATIC METRICS:\n{metrics}"
+    )
+
+
+def pack(items, model):
+    # First-fit decreasing by prompt tokens within the model's input budget
+    budget = prompt_budget.input_budget(model) - prompt_budget.count_tokens(PACKED_TEMPLATE)
+    sized = sorted(
+        ((prompt_budget.count_tokens(section(i)), i) for i in items),
+        key=lambda t: -t[0]
+    )
+
+    alone, groups = [], []
+    for tokens, item in sized:
+        if tokens > budget * PACK_MAX_SHARE:
+            alone.append([item])
+            continue
+        for g in groups:
+            if len(g["items"]) < PACK_MAX_ITEMS and g["tokens"] + tokens <= budget:
+                g["items"].append(item)
+                g["tokens"] += tokens
+                break
+        else:
+            groups.append({"items": [item], "tokens": tokens})
+
+    return alone + [g["items"] for g in groups]
+
+
+def packed_request(group, model):
+    prompt = PACKED_TEMPLATE.format(
+        submissions="\n\n".join(section(i) for i in group)
+    )
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": "Return ONLY a JSON array inside <json> tags."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        max_tokens=min(MAX_OUTPUT_TOKENS, THINKING_TOKENS + OUTPUT_TOKENS_PER_ITEM * len(group))
+    )
+
+
+def parse_packed(content):
+    match = re.search(r"<json>(.*?)</json>", content, re.S)
+    if not match:
+        return {}
+    try:
+        parsed = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, list):
+        return {}
+
+    results = {}
+    for r in parsed:
+        if isinstance(r, dict) and str(r.get("id", "")).isdigit():
+            results[int(r.pop("id"))] = r
+    return results
+
+# ---------------- MAIN API ----------------
+
+def evaluate_single(item, evaluate_one):
+    try:
+        return evaluate_one(item)
+    except Exception as e:
+        print(f"❌ Evaluation of submission {item['index']} failed:", e)
+        return None
+
+
+def evaluate_group(group, model, evaluate_one):
+    # Returns [(item, result or None)]; submissions missing from a packed
+    # answer are re-asked on their own
+    if len(group) == 1:
+        return [(group[0], evaluate_single(group[0], evaluate_one))]
+
+    try:
+        results = parse_packed(llm_gateway.chat_text(**packed_request(group, model)))
+    except Exception as e:
+        print("⚠️ Packed evaluation failed, retrying singly:", e)
+        results = {}
+
+    done = []
+    for item in group:
+        result = results.get(item["index"])
+        if result is None:
+            done.append((item, evaluate_single(item, evaluate_one)))
+            continue
+        evaluation_cache.put(item["packed_cache_key"], result)
+        done.append((item, result))
+    return done
+
+
+def run(items, model, evaluate_one):
+    # items: [{"index", "task", "code", "metrics", "cache_key",
+    # "packed_cache_key"}] already pre-screened and missed in the cache. Yields (item, result or None)
+    # as each model call finishes.
+    pool = ThreadPoolExecutor(CONCURRENCY, thread_name_prefix="batch-eval")
+    try:
+        pending = {
+            pool.submit(evaluate_group, g, model, evaluate_one)
+            for g in pack(items, model)
+        }
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield from future.result()
+    finally:
+        # Client went away: drop the groups that have not started
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services.db import pooled
+from services.github_analyzer import prepare_repo, review_repo
+from services.repo_store import save_analyses
+
+# ---------------- CONSTANTS ----------------
+# ZIP download + summary and Novita chat calls are limited independently:
+# GitHub tolerates far more parallel downloads than the LLM quota allows
+DOWNLOAD_WORKERS = int(os.getenv("BULK_DOWNLOAD_WORKERS", 8))
+LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", 3))
+COMMIT_BATCH_SIZE = int(os.getenv("BULK_COMMIT_BATCH_SIZE", 10))
+
+# ---------------- HELPERS ----------------
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def flush(pending, stage_seconds):
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    with pooled() as conn:
+        save_analyses(conn, pending)
+        conn.commit()
+    stage_seconds["save"] += time.perf_counter() - start
+    pending.clear()
+
+# ---------------- MAIN API ----------------
+
+def analyze_all(user_id, on_stage=None):
+    report = on_stage or (lambda stage: None)
+
+    with pooled() as conn:
+        repos = conn.execute(
+            "SELECT id, repo_url, default_branch FROM repositories WHERE user_id=?",
+            (user_id,)
+        ).fetchall()
+
+    started = time.perf_counter()
+    stage_seconds = {"fetch": 0.0, "review": 0.0, "save": 0.0}
+    analyzed = 0
+    cached = 0
+    failed = []
+    pending = []
+
+    with ThreadPoolExecutor(DOWNLOAD_WORKERS, thread_name_prefix="bulk-fetch") as fetch_pool, \
+            ThreadPoolExecutor(LLM_CONCURRENCY, thread_name_prefix="bulk-llm") as review_pool:
+
+        in_flight = {
+            fetch_pool.submit(timed, prepare_repo, r["repo_url"], r["default_branch"]): ("fetch", r)
+            for r in repos
+        }
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                stage, repo = in_flight.pop(fut)
+                try:
+                    value, seconds = fut.result()
+                except Exception as e:
+                    failed.append({"repo_id": repo["id"], "stage": stage, "error": str(e)})
+                    continue
+
+                stage_seconds[stage] += seconds
+
+                if stage == "fetch" and value["cached"] is None:
+                    review = review_pool.submit(timed, review_repo, repo["repo_url"], value)
+                    in_flight[review] = ("review", repo)
+                    continue
+
+                if stage == "fetch":
+                    cached += 1
+                    value = value["cached"]
+
+                analyzed += 1
+                pending.append((repo["id"], value))
+                if len(pending) >= COMMIT_BATCH_SIZE:
+                    flush(pending, stage_seconds)
+
+            report(f"{analyzed + len(failed)}/{len(repos)}")
+
+    flush(pending, stage_seconds)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total": len(repos),
+        "analyzed": analyzed,
+        "cached": cached,
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 2),
+        "repos_per_minute": round(analyzed / elapsed * 60, 2) if elapsed else 0,
+        # Summed across workers, so these can exceed elapsed_seconds
+        "stage_seconds": {k: round(v, 2) for k, v in stage_seconds.items()},
+        "pool": {
+            "download_workers": DOWNLOAD_WORKERS,
+            "llm_concurrency": LLM_CONCURRENCY,
+            "commit_batch_size": COMMIT_BATCH_SIZE
+        }
+    }
@@ -0,0 +1,117 @@
+# Cheap local checks run before a submission is sent to the model. Code
+# that is empty, oversized or does not parse is answered here; everything
+# else gets static metrics the prompt can quote instead of the model
+# working them out.
+
+import ast
+import io
+import os
+import tokenize
+
+# ---------------- CONSTANTS ----------------
+MAX_CODE_CHARS = int(os.getenv("EVALUATE_MAX_CODE_CHARS", 20000))
+MAX_CODE_LINES = int(os.getenv("EVALUATE_MAX_CODE_LINES", 600))
+
+# Nodes that add a decision point to a function's cyclomatic complexity
+BRANCH_NODES = (
+    ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While,
+    ast.ExceptHandler, ast.With, ast.AsyncWith, ast.Assert,
+    ast.comprehension, ast.match_case,
+)
+
+# ---------------- HELPERS ----------------
+
+def local_result(feedback, code, score=0):
+    return {
+        "feedback": feedback,
+        "improved_code": code,
+        "score": score,
+        "prescreened": True
+    }
+
+
+def code_lines(code):
+    # Lines holding something other than comments / whitespace
+    lines = set()
+    try:
+        for t in tokenize.generate_tokens(io.StringIO(code).readline):
+            if t.type not in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+                              tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+                lines.update(range(t.start[0], t.end[0] + 1))
+    except (tokenize.TokenError, SyntaxError):
+        return {
+            n for n, line in enumerate(code.splitlines(), 1)
+            if line.strip() and not line.strip().startswith("#")
+        }
+    return lines
+
+
+def complexity(func):
+    score = 1
+    for node in ast.walk(func):
+        if isinstance(node, BRANCH_NODES):
+            score += 1
+        elif isinstance(node, ast.BoolOp):
+            score += len(node.values) - 1
+    return score
+
+
+def metrics(tree, code, logical_lines):
+    functions = [
+        n for n in ast.walk(tree)
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+    classes = [n for n in ast.walk(tree) if isinstance(n, ast.ClassDef)]
+
+    per_function = {f.name: complexity(f) for f in functions}
+    missing_docstrings = [
+        n.name for n in functions + classes if ast.get_docstring(n) is None
+    ]
+
+    return {
+        "lines": len(code.splitlines()),
+        "code_lines": len(logical_lines),
+        "functions": len(functions),
+        "classes": len(classes),
+        "max_complexity": max(per_function.values(), default=complexity(tree)),
+        "complex_functions": sorted(n for n, c in per_function.items() if c > 10),
+        "missing_docstrings": missing_docstrings,
+    }
+
+# ---------------- MAIN API ----------------
+
+def prescreen(code):
+    # Returns {"result": local answer or None, "metrics": dict or None}
+    if len(code) > MAX_CODE_CHARS or code.count("\n") >= MAX_CODE_LINES:
+        return {"result": local_result([
+            f"Submission too large: keep it under {MAX_CODE_LINES} lines "
+            f"and {MAX_CODE_CHARS} characters"
+        ], code), "metrics": None}
+
+    logical_lines = code_lines(code)
+    if not logical_lines:
+        return {"result": local_result(["No code submitted"], ""), "metrics": None}
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        where = f" on line {e.lineno}" if e.lineno else ""
+        return {"result": local_result([
+            f"Syntax error{where}: {e.msg}",
+            "Fix the syntax error and submit again"
+        ], code), "metrics": None}
+
+    return {"result": None, "metrics": metrics(tree, code, logical_lines)}
+
+
+def format_metrics(m):
+    lines = [
+        f"- lines: {m['lines']} ({m['code_lines']} code)",
+        f"- functions: {m['functions']}, classes: {m['classes']}",
+        f"- max cyclomatic complexity: {m['max_complexity']}",
+    ]
+    if m["complex_functions"]:
+        lines.append(f"- complexity > 10: {', '.join(m['complex_functions'])}")
+    if m["missing_docstrings"]:
+        lines.append(f"- missing docstrings: {', '.join(m['missing_docstrings'])}")
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+# ---------------- CONSTANTS ----------------
+DATABASE = os.getenv("DATABASE_PATH", "users.db")
+
+# Idle connections kept per process; extra ones are closed on release
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+CACHE_SIZE_KIB = int(os.getenv("DB_CACHE_SIZE_KIB", 16 * 1024))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 128 * 1024 * 1024))
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+# ---------------- CONNECTIONS ----------------
+
+def configure(conn):
+    # WAL lets dashboard reads proceed while analysis jobs write
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def connect():
+    # Pooled connections move between threads, but only one uses each at a time
+    conn = sqlite3.connect(
+        DATABASE,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    configure(conn)
+    return conn
+
+# ---------------- POOL ----------------
+
+def acquire():
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return connect()
+
+
+def release(conn):
+    # Never hand out a connection with someone else's open transaction
+    if conn.in_transaction:
+        conn.rollback()
+
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+@contextmanager
+def pooled():
+    conn = acquire()
+    try:
+        yield conn
+    finally:
+        release(conn)
+
+# ---------------- FLASK ----------------
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+
+
+def get_db():
+    from flask import g
+
+    if "db" not in g:
+        g.db = acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    from flask import g
+
+    conn = g.pop("db", None)
+    if conn is not None:
+        release(conn)
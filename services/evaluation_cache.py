@@ -0,0 +1,166 @@
+# Result cache for /learning/evaluate, keyed on the task plus a fingerprint
+# of the code that ignores comments and formatting. Hit/miss totals are
+# kept in cache_counters; inspect them with
+#
+#   python -m services.evaluation_cache [--reset-counters]
+
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import tokenize
+
+from services.db import pooled
+
+# ---------------- CONSTANTS ----------------
+CACHE_TTL_SECONDS = int(os.getenv("EVALUATION_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("EVALUATION_CACHE_MAX_ENTRIES", 20000))
+
+COUNTER_NAME = "evaluation"
+
+# Comments and layout-only tokens are not part of the fingerprint
+SKIP_TOKENS = {
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+    tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER,
+}
+
+# ---------------- FINGERPRINT ----------------
+
+def fingerprint(code):
+    # Python that parses is keyed on its AST, so comments, blank lines and
+    # formatting do not matter; anything else on its significant tokens
+    try:
+        tree = ast.parse(code)
+        return "ast:" + ast.dump(tree, include_attributes=False)
+    except (SyntaxError, ValueError):
+        pass
+
+    try:
+        return "tok:" + " ".join(
+            t.string for t in tokenize.generate_tokens(io.StringIO(code).readline)
+            if t.type not in SKIP_TOKENS
+        )
+    except (tokenize.TokenError, SyntaxError):
+        # Unterminated strings/brackets swallow the rest: key on the text
+        return "txt:" + re.sub(r"\s+", " ", code).strip()
+
+
+def make_key(task, code, prompt_version, model):
+    raw = "\0".join([
+        re.sub(r"\s+", " ", task).strip(),
+        fingerprint(code),
+        prompt_version,
+        model
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ---------------- HELPERS ----------------
+
+def count(conn, hit):
+    column = "hits" if hit else "misses"
+    conn.execute(f"""
+        INSERT INTO cache_counters (name, hits, misses) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET {column}={column} + 1
+    """, (COUNTER_NAME, int(hit), int(not hit)))
+
+
+def evict(conn):
+    now = time.time()
+
+    conn.execute(
+        "DELETE FROM evaluation_cache WHERE created_at < ?",
+        (now - CACHE_TTL_SECONDS,)
+    )
+
+    # Least recently used entries go first once the cap is exceeded
+    conn.execute("""
+        DELETE FROM evaluation_cache
+        WHERE cache_key NOT IN (
+            SELECT cache_key FROM evaluation_cache
+            ORDER BY last_used_at DESC
+            LIMIT ?
+        )
+    """, (CACHE_MAX_ENTRIES,))
+
+# ---------------- MAIN API ----------------
+
+def get(cache_key, *fallback_keys):
+    # First fresh entry among the keys; one lookup for the hit/miss counters
+    with pooled() as conn:
+        now = time.time()
+        row = None
+        for key in (cache_key,) + fallback_keys:
+            row = conn.execute("""
+                SELECT result_json, created_at
+                FROM evaluation_cache
+                WHERE cache_key=?
+            """, (key,)).fetchone()
+
+            if row and now - row["created_at"] > CACHE_TTL_SECONDS:
+                conn.execute("DELETE FROM evaluation_cache WHERE cache_key=?", (key,))
+                row = None
+            if row:
+                break
+
+        count(conn, row is not None)
+        if row:
+            conn.execute("""
+                UPDATE evaluation_cache
+                SET last_used_at=?, hits=hits + 1
+                WHERE cache_key=?
+            """, (now, key))
+        conn.commit()
+
+        return json.loads(row["result_json"]) if row else None
+
+
+def put(cache_key, result):
+    now = time.time()
+    with pooled() as conn:
+        conn.execute("""
+            INSERT INTO evaluation_cache (cache_key, result_json, created_at, last_used_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                result_json=excluded.result_json,
+                created_at=excluded.created_at,
+                last_used_at=excluded.last_used_at
+        """, (cache_key, json.dumps(result), now, now))
+        evict(conn)
+        conn.commit()
+
+
+def stats():
+    with pooled() as conn:
+        row = conn.execute(
+            "SELECT hits, misses FROM cache_counters WHERE name=?", (COUNTER_NAME,)
+        ).fetchone()
+        entries = conn.execute("SELECT COUNT(*) FROM evaluation_cache").fetchone()[0]
+
+    hits, misses = (row["hits"], row["misses"]) if row else (0, 0)
+    return {
+        "entries": entries,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+    }
+
+
+def reset_counters():
+    with pooled() as conn:
+        conn.execute("DELETE FROM cache_counters WHERE name=?", (COUNTER_NAME,))
+        conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show evaluation cache statistics")
+    parser.add_argument("--reset-counters", action="store_true",
+                        help="zero the hit/miss totals after printing them")
+    args = parser.parse_args()
+
+    print(stats())
+    if args.reset_counters:
+        reset_counters()
@@ -1,28 +1,31 @@
-from openai import OpenAI
 import os
-import requests
 import zipfile
 import io
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import json
 import re
 
+from services import analysis_cache, http_client, llm_gateway, prompt_budget, repo_sampler
+
 # ---------------- LOAD ENV ----------------
 load_dotenv()
 
-NOVITA_API_KEY = os.getenv("NOVITA_API_KEY")
-if not NOVITA_API_KEY:
-    raise RuntimeError("NOVITA_API_KEY not set in .env")
+# ---------------- CONSTANTS ----------------
+MAX_README_CHARS = 3000
 
-client = OpenAI(
-    api_key=NOVITA_API_KEY,
-    base_url="https://api.novita.ai/openai"
-)
+# ZIP downloads are streamed to a spooled temp file: small archives stay in
+# memory, larger ones spill to disk, anything over the ceiling is rejected
+MAX_ZIP_BYTES = int(os.getenv("MAX_ZIP_BYTES", 200 * 1024 * 1024))
+ZIP_SPOOL_BYTES = int(os.getenv("ZIP_SPOOL_BYTES", 8 * 1024 * 1024))
+ZIP_CHUNK_BYTES = 64 * 1024
 
-# ---------------- CONSTANTS ----------------
-MAX_FILES = 15
-MAX_FILE_CHARS = 1500
+ANALYSIS_MODEL = "baidu/ernie-4.5-vl-424b-a47b"
+# Bump whenever build_prompt changes so cached analyses are not reused
+PROMPT_VERSION = "3"
+# The README is worth this many code chunks of the same size
+README_WEIGHT = 2.0
 
 # ---------------- HELPERS ----------------
 
@@ -38,17 +41,63 @@ def parse_github_url(url: str):
     return parts[-2], parts[-1]
 
 
-def download_repo_zip(owner, repo):
-    for branch in ("main", "master"):
-        zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/{branch}.zip"
-        r = requests.get(zip_url, timeout=30)
+def resolve_commit_sha(owner, repo, branch=None):
+    # HEAD follows the repo's default branch when none is stored yet
+    r = http_client.get(
+        f"https://api.github.com/repos/{owner}/{repo}/commits/{branch or 'HEAD'}",
+        headers={"Accept": "application/vnd.github.sha"}
+    )
+    if r.status_code != 200:
+        # No SHA => no cache key: this analysis bypasses the analysis cache
+        print(
+            f"⚠️ Commit SHA for {owner}/{repo} not resolved "
+            f"(HTTP {r.status_code}, rate limit remaining "
+            f"{r.headers.get('X-RateLimit-Remaining', '?')}); analysis cache skipped"
+        )
+        return None
+    return r.text.strip() or None
+
+
+def spool_response(r):
+    declared = int(r.headers.get("Content-Length") or 0)
+    if declared > MAX_ZIP_BYTES:
+        raise RuntimeError("Repository ZIP exceeds size limit")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_BYTES)
+    total = 0
+    for chunk in r.iter_content(ZIP_CHUNK_BYTES):
+        total += len(chunk)
+        if total > MAX_ZIP_BYTES:
+            spool.close()
+            raise RuntimeError("Repository ZIP exceeds size limit")
+        spool.write(chunk)
+
+    spool.seek(0)
+    return spool
+
+
+def download_repo_zip(owner, repo, ref="HEAD"):
+    zip_url = f"https://codeload.github.com/{owner}/{repo}/zip/{ref}"
+    with http_client.get(zip_url, stream=True) as r:
         if r.status_code == 200:
-            return r.content
+            return spool_response(r)
 
     raise RuntimeError("Could not download repository ZIP")
 
 
-def extract_repo_summary(zip_bytes):
+def read_prefix(z, info, max_bytes):
+    # Only this prefix is decompressed; a character cut at the end is dropped
+    with z.open(info) as fh:
+        data = fh.read(max_bytes)
+    return data.decode("utf-8", errors="ignore")
+
+
+def read_member(z, info, max_chars):
+    # UTF-8 is at most 4 bytes per char
+    return read_prefix(z, info, max_chars * 4)[:max_chars]
+
+
+def extract_repo_summary(zip_file):
     summary = {
         "total_files": 0,
         "file_types": {},
@@ -56,57 +105,62 @@ def extract_repo_summary(zip_bytes):
         "code_samples": []
     }
 
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as z:
-        files = [f for f in z.namelist() if not f.endswith("/")]
+    if isinstance(zip_file, (bytes, bytearray)):
+        zip_file = io.BytesIO(zip_file)
+
+    # Only the central directory is parsed up front; member data is read
+    # lazily for the README and the selected samples
+    with zipfile.ZipFile(zip_file) as z:
+        files = [i for i in z.infolist() if not i.is_dir()]
         summary["total_files"] = len(files)
 
-        for f in files:
-            ext = Path(f).suffix.lower()
+        for info in files:
+            ext = Path(info.filename).suffix.lower()
             summary["file_types"][ext] = summary["file_types"].get(ext, 0) + 1
 
-        for f in files:
-            if Path(f).name.lower().startswith("readme"):
-                summary["readme"] = z.read(f).decode("utf-8", errors="ignore")[:3000]
+        for info in files:
+            if Path(info.filename).name.lower().startswith("readme"):
+                summary["readme"] = read_member(z, info, MAX_README_CHARS)
                 break
 
-        source_exts = {".py", ".js", ".ts", ".java", ".cpp", ".c", ".go", ".rs"}
-        for f in files:
-            if Path(f).suffix.lower() in source_exts:
-                try:
-                    content = z.read(f).decode("utf-8", errors="ignore")
-                    summary["code_samples"].append({
-                        "file": f,
-                        "content": content[:MAX_FILE_CHARS]
-                    })
-                except:
-                    pass
-
-            if len(summary["code_samples"]) >= MAX_FILES:
-                break
+        samples = repo_sampler.select(files)
+        top = max((c["score"] for c in samples), default=1.0)
+        for c in samples:
+            try:
+                summary["code_samples"].append({
+                    "file": c["path"],
+                    "content": read_prefix(z, c["info"], c["bytes"]),
+                    # Relative value for the prompt packer
+                    "weight": round(max(0.25, c["score"] / top), 2)
+                })
+            except (zipfile.BadZipFile, OSError, RuntimeError):
+                pass
 
     return summary
 
 
-def build_prompt(repo_url, summary):
-    return f"""
-You are a senior software engineer performing an AI-assisted review of a public GitHub repository.
+def build_prompt(repo_url, summary, model=ANALYSIS_MODEL):
+    file_types = " ".join(
+        f"{ext or '(none)'}:{n}"
+        for ext, n in sorted(summary["file_types"].items(), key=lambda kv: -kv[1])
+    )
 
-Repository URL:
-{repo_url}
+    head = f"""
+You are a senior software engineer performing an AI-assisted review of a public GitHub repository.
 
+Repository URL: {repo_url}
 Total files: {summary['total_files']}
-File types:
-{json.dumps(summary['file_types'], indent=2)}
+File types: {file_types}
+
+Each section below starts with "=== <name> ===" followed by raw text; "…" marks a cut.
 
-README:
-{summary['readme'] or "No README"}
+"""
 
-Code Samples:
-{json.dumps(summary['code_samples'], indent=2)}
+    tail = """
 
 Return ONLY valid JSON:
 
-{{
+{
   "documentation_score": 0-100,
   "code_quality_score": 0-100,
   "maintainability_score": 0-100,
@@ -114,9 +168,19 @@ Return ONLY valid JSON:
   "strengths": [],
   "weaknesses": [],
   "improvement_suggestions": []
-}}
+}
 """
 
+    # README and samples share one token budget, packed by value per token
+    sections = [("=== README ===", summary["readme"] or "No README", README_WEIGHT)]
+    sections += [
+        (f"=== {s['file']} ===", s["content"], s.get("weight", 1.0))
+        for s in summary["code_samples"]
+    ]
+
+    budget = prompt_budget.input_budget(model) - prompt_budget.count_tokens(head + tail)
+    return head + prompt_budget.pack(sections, max(budget, 0)) + tail
+
 
 def extract_json(text):
     match = re.search(r"\{[\s\S]*\}", text)
@@ -127,14 +191,42 @@ def extract_json(text):
 
 # ---------------- MAIN API ----------------
 
-def analyze_repo(repo_url):
+def prepare_repo(repo_url, default_branch=None, on_stage=None):
+    report = on_stage or (lambda stage: None)
     owner, repo = parse_github_url(repo_url)
-    zip_bytes = download_repo_zip(owner, repo)
-    summary = extract_repo_summary(zip_bytes)
-    prompt = build_prompt(repo_url, summary)
+    prepared = {
+        "repo": f"{owner}/{repo}",
+        "commit_sha": None,
+        "cache_key": None,
+        "cached": None,
+        "summary": None
+    }
+
+    # ✅ SAME COMMIT + PROMPT + MODEL => REUSE STORED ANALYSIS
+    report("resolving")
+    commit_sha = resolve_commit_sha(owner, repo, default_branch)
+    if commit_sha:
+        prepared["commit_sha"] = commit_sha
+        prepared["cache_key"] = analysis_cache.make_key(
+            prepared["repo"], commit_sha, PROMPT_VERSION, ANALYSIS_MODEL
+        )
+        prepared["cached"] = analysis_cache.get(prepared["cache_key"])
+        if prepared["cached"] is not None:
+            return prepared
+
+    report("downloading")
+    ref = commit_sha or default_branch or "HEAD"
+    with download_repo_zip(owner, repo, ref) as zip_file:
+        prepared["summary"] = extract_repo_summary(zip_file)
+
+    return prepared
 
-    response = client.chat.completions.create(
-        model="baidu/ernie-4.5-vl-424b-a47b",
+
+def review_repo(repo_url, prepared):
+    prompt = build_prompt(repo_url, prepared["summary"], ANALYSIS_MODEL)
+
+    content = llm_gateway.chat_text(
+        model=ANALYSIS_MODEL,
         messages=[
             {"role": "system", "content": "You are a professional GitHub repository reviewer."},
             {"role": "user", "content": prompt}
@@ -143,5 +235,23 @@ def analyze_repo(repo_url):
         max_tokens=3000
     )
 
-    raw = response.choices[0].message.content.strip()
-    return extract_json(raw)
+    raw = content.strip()
+    result = extract_json(raw)
+
+    if prepared["cache_key"]:
+        analysis_cache.put(
+            prepared["cache_key"], prepared["repo"], prepared["commit_sha"],
+            PROMPT_VERSION, ANALYSIS_MODEL, result
+        )
+
+    return result
+
+
+def analyze_repo(repo_url, default_branch=None, on_stage=None):
+    prepared = prepare_repo(repo_url, default_branch, on_stage)
+    if prepared["cached"] is not None:
+        return prepared["cached"]
+
+    if on_stage:
+        on_stage("reviewing")
+    return review_repo(repo_url, prepared)
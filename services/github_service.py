@@ -1,14 +1,90 @@
-import requests
+from services import http_client
+
+# ---------------- CONSTANTS ----------------
+REPOS_PER_PAGE = 100
+
+# ---------------- HELPERS ----------------
+
+def parse_repo(repo):
+    return {
+        "url": repo["html_url"],
+        "language": repo["language"] or "Unknown",
+        "default_branch": repo.get("default_branch")
+    }
+
+
+def repos_page_url(username, page):
+    return (
+        f"https://api.github.com/users/{username}/repos"
+        f"?per_page={REPOS_PER_PAGE}&page={page}"
+    )
+
+
+def conditional_headers(validator):
+    headers = {}
+    if validator.get("etag"):
+        headers["If-None-Match"] = validator["etag"]
+    if validator.get("last_modified"):
+        headers["If-Modified-Since"] = validator["last_modified"]
+    return headers
+
+# ---------------- MAIN API ----------------
+
+# validators: per-page [{"etag", "last_modified"}] from the previous sync.
+# When every page answers 304 nothing is downloaded and repos is None.
+def sync_public_repos(username, validators=None):
+    validators = validators or []
+    pages = []
+    new_validators = []
+    changed = False
+
+    page = 1
+    while True:
+        validator = validators[page - 1] if page <= len(validators) else {}
+        response = http_client.get(
+            repos_page_url(username, page),
+            headers=conditional_headers(validator)
+        )
+
+        if response.status_code == 304:
+            pages.append(None)
+            new_validators.append(validator)
+            # 304s carry no body and may omit Link; trust the stored page count
+            has_next = page < len(validators)
+        else:
+            response.raise_for_status()
+            changed = True
+            pages.append([parse_repo(r) for r in response.json()])
+            new_validators.append({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            })
+            has_next = "next" in response.links
+
+        if not has_next:
+            break
+        page += 1
+
+    if not changed:
+        return {"not_modified": True, "repos": None, "validators": new_validators}
+
+    # Something moved: pages that answered 304 are needed for the full list
+    for i, items in enumerate(pages):
+        if items is None:
+            response = http_client.get(repos_page_url(username, i + 1))
+            response.raise_for_status()
+            pages[i] = [parse_repo(r) for r in response.json()]
+            new_validators[i] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+
+    return {
+        "not_modified": False,
+        "repos": [r for items in pages for r in items],
+        "validators": new_validators
+    }
+
 
 def fetch_public_repos(username):
-    url = f"https://api.github.com/users/{username}/repos"
-    response = requests.get(url)
-    response.raise_for_status()
-
-    repos = []
-    for repo in response.json():
-        repos.append({
-            "url": repo["html_url"],
-            "language": repo["language"] or "Unknown"
-        })
-    return repos
+    return sync_public_repos(username)["repos"]
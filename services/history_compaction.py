@@ -0,0 +1,164 @@
+# Retention for repo_analysis_history.
+#
+#   python -m services.history_compaction [--raw-days 90] [--daily-days 365]
+#
+# Raw rows older than --raw-days become per-day rollups; day rollups older
+# than --daily-days become per-week rollups. Raw rows are deleted in chunks,
+# each chunk in its own short transaction, then freed pages are returned
+# with incremental VACUUM.
+
+import argparse
+import os
+import time
+
+from services.db import pooled
+from services.timeseries import SCORES
+
+# ---------------- CONSTANTS ----------------
+RAW_RETENTION_DAYS = int(os.getenv("HISTORY_RAW_RETENTION_DAYS", 90))
+DAILY_RETENTION_DAYS = int(os.getenv("HISTORY_DAILY_RETENTION_DAYS", 365))
+CHUNK_ROWS = int(os.getenv("HISTORY_COMPACTION_CHUNK_ROWS", 5000))
+VACUUM_PAGES = int(os.getenv("HISTORY_VACUUM_PAGES", 2000))
+
+ROLLUP_COLUMNS = ", ".join(
+    f"{key}_sum, {key}_min, {key}_max" for key in SCORES.values()
+)
+
+# Merge a new rollup into an existing bucket
+MERGE_SQL = "n = n + excluded.n, " + ", ".join(
+    f"{key}_sum = {key}_sum + excluded.{key}_sum, "
+    f"{key}_min = MIN({key}_min, excluded.{key}_min), "
+    f"{key}_max = MAX({key}_max, excluded.{key}_max)"
+    for key in SCORES.values()
+)
+
+# ---------------- STAGES ----------------
+
+def compact_raw(conn, cutoff):
+    raw_aggregates = ", ".join(
+        f"SUM({col}), MIN({col}), MAX({col})" for col in SCORES
+    )
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS compaction_batch (id INTEGER PRIMARY KEY)")
+
+    total = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM compaction_batch")
+            # Oldest rows sit at the start of the rowid order
+            moved = conn.execute("""
+                INSERT INTO compaction_batch (id)
+                SELECT id FROM repo_analysis_history
+                WHERE created_at < ?
+                ORDER BY id
+                LIMIT ?
+            """, (cutoff, CHUNK_ROWS)).rowcount
+
+            if moved:
+                conn.execute(f"""
+                    INSERT INTO repo_analysis_history_rollup (
+                        repo_id, period, bucket, n, {ROLLUP_COLUMNS}
+                    )
+                    SELECT h.repo_id, 'day', date(h.created_at), COUNT(*), {raw_aggregates}
+                    FROM repo_analysis_history h
+                    JOIN compaction_batch b ON b.id = h.id
+                    GROUP BY h.repo_id, date(h.created_at)
+                    ON CONFLICT(repo_id, period, bucket) DO UPDATE SET {MERGE_SQL}
+                """)
+                conn.execute("""
+                    DELETE FROM repo_analysis_history
+                    WHERE id IN (SELECT id FROM compaction_batch)
+                """)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        total += moved
+        if moved < CHUNK_ROWS:
+            return total
+
+
+def compact_daily(conn, cutoff):
+    rollup_aggregates = ", ".join(
+        f"SUM({key}_sum), MIN({key}_min), MAX({key}_max)" for key in SCORES.values()
+    )
+    week = "date(bucket, '-6 days', 'weekday 1')"
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"""
+            INSERT INTO repo_analysis_history_rollup (
+                repo_id, period, bucket, n, {ROLLUP_COLUMNS}
+            )
+            SELECT repo_id, 'week', {week}, SUM(n), {rollup_aggregates}
+            FROM repo_analysis_history_rollup
+            WHERE period = 'day' AND bucket < ?
+            GROUP BY repo_id, {week}
+            ON CONFLICT(repo_id, period, bucket) DO UPDATE SET {MERGE_SQL}
+        """, (cutoff,))
+        moved = conn.execute("""
+            DELETE FROM repo_analysis_history_rollup
+            WHERE period = 'day' AND bucket < ?
+        """, (cutoff,)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return moved
+
+
+def free_pages(conn):
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def reclaim_space(conn):
+    before = free_pages(conn)
+
+    # auto_vacuum only switches modes after one full VACUUM
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        mode = "full"
+    else:
+        # execute() steps the pragma once, which frees a single page;
+        # executescript() runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+        mode = "incremental"
+
+    return {"mode": mode, "free_pages_before": before, "free_pages_after": free_pages(conn)}
+
+# ---------------- MAIN API ----------------
+
+def compact_history(raw_days=RAW_RETENTION_DAYS, daily_days=DAILY_RETENTION_DAYS):
+    started = time.perf_counter()
+
+    with pooled() as conn:
+        raw_cutoff = conn.execute(
+            "SELECT datetime('now', ?)", (f"-{raw_days} days",)
+        ).fetchone()[0]
+        daily_cutoff = conn.execute(
+            "SELECT date('now', ?)", (f"-{daily_days} days",)
+        ).fetchone()[0]
+
+        raw_rows = compact_raw(conn, raw_cutoff)
+        day_rows = compact_daily(conn, daily_cutoff)
+        vacuum = reclaim_space(conn)
+
+    return {
+        "raw_rows_compacted": raw_rows,
+        "day_rollups_compacted": day_rows,
+        "vacuum": vacuum,
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact repo_analysis_history")
+    parser.add_argument("--raw-days", type=int, default=RAW_RETENTION_DAYS)
+    parser.add_argument("--daily-days", type=int, default=DAILY_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    print(compact_history(args.raw_days, args.daily_days))
@@ -0,0 +1,61 @@
+import os
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------- LOAD ENV ----------------
+load_dotenv()
+
+# ---------------- CONSTANTS ----------------
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 20))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Optional: lifts the GitHub API limit from 60 to 5000 requests/hour.
+# Only ever sent to GITHUB_API_HOST
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_API_HOST = "api.github.com"
+
+# ---------------- SESSION ----------------
+
+def build_session():
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry
+    )
+
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+# One keep-alive pool per process, shared by every services module
+session = build_session()
+
+# ---------------- MAIN API ----------------
+
+def get(url, **kwargs):
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    if GITHUB_TOKEN and urlsplit(url).hostname == GITHUB_API_HOST:
+        headers = dict(kwargs.get("headers") or {})
+        headers.setdefault("Authorization", f"Bearer {GITHUB_TOKEN}")
+        kwargs["headers"] = headers
+    return session.get(url, **kwargs)
@@ -0,0 +1,211 @@
+# Single entry point for ERNIE calls on Novita. Owns one pooled httpx-backed
+# client and puts every call behind a per-model concurrency cap, a per-model
+# token bucket sized to the Novita quota, jittered retries on 429/5xx and an
+# overall deadline, so a slow upstream can no longer hold a worker
+# indefinitely.
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from services import singleflight
+
+# ---------------- LOAD ENV ----------------
+load_dotenv()
+
+NOVITA_API_KEY = os.getenv("NOVITA_API_KEY")
+if not NOVITA_API_KEY:
+    raise RuntimeError("NOVITA_API_KEY not set in .env")
+
+# ---------------- CONSTANTS ----------------
+NOVITA_BASE_URL = os.getenv("NOVITA_BASE_URL", "https://api.novita.ai/openai")
+
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+# Per-attempt ceiling; the thinking model can take minutes on 6000 tokens
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 120))
+# Whole-call budget across queueing, rate limiting and retries
+DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 300))
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", 1))
+BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 20))
+
+# In-flight requests per model in this process
+MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", 4))
+# Novita quotas are per model, in requests per minute
+REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+BURST = int(os.getenv("LLM_BURST", 5))
+
+RETRY_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+# ---------------- CLIENTS ----------------
+
+def timeout():
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def limits():
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS
+    )
+
+
+# Retries are ours (jittered, deadline-aware), so the SDK's are disabled
+client = OpenAI(
+    api_key=NOVITA_API_KEY,
+    base_url=NOVITA_BASE_URL,
+    max_retries=0,
+    http_client=httpx.Client(limits=limits(), timeout=timeout())
+)
+
+# ---------------- LIMITS ----------------
+
+class TokenBucket:
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token now and returns how long to wait before using it;
+        # the balance goes negative so waiters queue up in order
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+_limits_lock = threading.Lock()
+_semaphores = {}
+_buckets = {}
+
+
+def model_limits(model):
+    with _limits_lock:
+        if model not in _semaphores:
+            _semaphores[model] = threading.BoundedSemaphore(MODEL_CONCURRENCY)
+            _buckets[model] = TokenBucket(REQUESTS_PER_MINUTE, BURST)
+        return _semaphores[model], _buckets[model]
+
+
+def remaining(deadline):
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("LLM deadline exceeded")
+    return left
+
+
+def backoff(attempt, error):
+    retry_after = None
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after", ""))
+        except ValueError:
+            pass
+
+    if retry_after is not None:
+        return retry_after
+    # Full jitter keeps workers that failed together from retrying together
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_SECONDS * 2 ** attempt))
+
+
+def attempt_timeout(deadline):
+    return httpx.Timeout(min(READ_TIMEOUT, remaining(deadline)), connect=CONNECT_TIMEOUT)
+
+# ---------------- SYNC API ----------------
+
+@contextmanager
+def slot(model, deadline):
+    semaphore, _ = model_limits(model)
+    if not semaphore.acquire(timeout=remaining(deadline)):
+        raise TimeoutError("LLM deadline exceeded waiting for a slot")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def with_retries(create, request, deadline):
+    _, bucket = model_limits(request["model"])
+
+    for attempt in range(MAX_RETRIES + 1):
+        wait = bucket.reserve()
+        if wait >= remaining(deadline):
+            raise TimeoutError("LLM deadline exceeded waiting for rate limit")
+        time.sleep(wait)
+
+        try:
+            return create(timeout=attempt_timeout(deadline), **request)
+        except RETRY_ERRORS as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff(attempt, e)
+            if delay >= remaining(deadline):
+                raise
+            print(f"⚠️ LLM retry {attempt + 1} for {request['model']}: {e}")
+            time.sleep(delay)
+
+
+def chat(deadline=None, **request):
+    deadline = deadline or time.monotonic() + DEADLINE_SECONDS
+    with slot(request["model"], deadline):
+        return with_retries(client.chat.completions.create, request, deadline)
+
+
+def chat_text(**request):
+    # Identical in-flight requests share one upstream call
+    return singleflight.do(
+        singleflight.make_key(request),
+        lambda: chat(**request).choices[0].message.content,
+        DEADLINE_SECONDS
+    )
+
+
+def chat_stream(deadline=None, **request):
+    # Yields content deltas; "" for chunks without content (the thinking
+    # model reasons first) so callers can keep their connection alive.
+    # The model slot is held until the stream ends; retries only cover
+    # opening the stream, not one cut mid-way.
+    deadline = deadline or time.monotonic() + DEADLINE_SECONDS
+    with slot(request["model"], deadline):
+        stream = with_retries(
+            client.chat.completions.create, dict(request, stream=True), deadline
+        )
+        try:
+            for chunk in stream:
+                remaining(deadline)
+                delta = chunk.choices[0].delta if chunk.choices else None
+                yield (delta.content or "") if delta else ""
+        finally:
+            # Consumer gone (SSE client disconnected) or deadline hit:
+            # release the upstream connection instead of leaking it
+            stream.close()
+
+
+def chat_stream_shared(**request):
+    # chat_stream behind single-flight: one caller streams upstream, while
+    # identical concurrent callers (chat_text included) wait with "" chunks
+    # and then get the finished text as a single chunk
+    return singleflight.stream(
+        singleflight.make_key(request),
+        lambda: chat_stream(**request),
+        DEADLINE_SECONDS
+    )
@@ -0,0 +1,322 @@
+# Versioned schema migrations. The applied version lives in
+# PRAGMA user_version; each step runs in its own transaction.
+
+# ---------------- MIGRATIONS ----------------
+
+def add_column(table, column, decl):
+    def step(conn):
+        columns = [c[1] for c in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return step
+
+
+# Version 1 uses IF NOT EXISTS so databases created by the old ad-hoc
+# create_table() are adopted as-is
+BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        email TEXT UNIQUE,
+        password TEXT,
+        github_username TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS repositories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        repo_url TEXT,
+        language TEXT,
+        UNIQUE(user_id, repo_url)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS repo_analysis (
+        repo_id INTEGER UNIQUE,
+        documentation_score INTEGER,
+        code_quality_score INTEGER,
+        maintainability_score INTEGER,
+        developer_level TEXT,
+        strengths TEXT,
+        weaknesses TEXT,
+        improvements TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS learning_roadmaps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        skill TEXT,
+        roadmap_json TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS repo_analysis_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        repo_id INTEGER,
+        documentation_score INTEGER,
+        code_quality_score INTEGER,
+        maintainability_score INTEGER,
+        developer_level TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analysis_cache (
+        cache_key TEXT PRIMARY KEY,
+        repo TEXT,
+        commit_sha TEXT,
+        prompt_version TEXT,
+        model TEXT,
+        result_json TEXT,
+        hits INTEGER DEFAULT 0,
+        created_at REAL,
+        last_used_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS github_sync_state (
+        user_id INTEGER PRIMARY KEY,
+        github_username TEXT,
+        validators TEXT,
+        synced_at DATETIME
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analysis_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        repo_id INTEGER,
+        kind TEXT,
+        status TEXT,
+        stage TEXT,
+        error TEXT,
+        result_json TEXT,
+        created_at REAL,
+        updated_at REAL
+    )
+    """
+]
+
+# Dashboard/profile counters. Row user_id=0 holds the global counters.
+# Triggers keep them current inside the same transaction as the write
+# that changes them (signup, repo sync, repo_analysis upsert).
+USER_STATS = [
+    """
+    CREATE TABLE user_stats (
+        user_id INTEGER PRIMARY KEY,
+        user_count INTEGER NOT NULL DEFAULT 0,
+        repo_count INTEGER NOT NULL DEFAULT 0,
+        analyzed_count INTEGER NOT NULL DEFAULT 0,
+        code_quality_sum INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    INSERT INTO user_stats (user_id, user_count)
+    SELECT 0, COUNT(*) FROM users
+    """,
+    """
+    INSERT INTO user_stats (user_id, repo_count, analyzed_count, code_quality_sum)
+    SELECT r.user_id,
+           COUNT(*),
+           COUNT(a.repo_id),
+           IFNULL(SUM(a.code_quality_score), 0)
+    FROM repositories r
+    LEFT JOIN repo_analysis a ON a.repo_id = r.id
+    WHERE r.user_id IS NOT NULL
+    GROUP BY r.user_id
+    """,
+    """
+    CREATE TRIGGER trg_users_insert_stats AFTER INSERT ON users
+    BEGIN
+        UPDATE user_stats SET user_count = user_count + 1 WHERE user_id = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_users_delete_stats AFTER DELETE ON users
+    BEGIN
+        UPDATE user_stats SET user_count = user_count - 1 WHERE user_id = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_repositories_insert_stats AFTER INSERT ON repositories
+    BEGIN
+        INSERT INTO user_stats (user_id, repo_count) VALUES (NEW.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET repo_count = repo_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_repositories_delete_stats AFTER DELETE ON repositories
+    BEGIN
+        UPDATE user_stats SET repo_count = repo_count - 1 WHERE user_id = OLD.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_repo_analysis_insert_stats AFTER INSERT ON repo_analysis
+    BEGIN
+        INSERT INTO user_stats (user_id, analyzed_count, code_quality_sum)
+        SELECT user_id, 1, IFNULL(NEW.code_quality_score, 0)
+        FROM repositories WHERE id = NEW.repo_id
+        ON CONFLICT(user_id) DO UPDATE SET
+            analyzed_count = analyzed_count + 1,
+            code_quality_sum = code_quality_sum + excluded.code_quality_sum;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_repo_analysis_update_stats AFTER UPDATE OF code_quality_score ON repo_analysis
+    BEGIN
+        UPDATE user_stats
+        SET code_quality_sum = code_quality_sum
+            + IFNULL(NEW.code_quality_score, 0) - IFNULL(OLD.code_quality_score, 0)
+        WHERE user_id = (SELECT user_id FROM repositories WHERE id = NEW.repo_id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_repo_analysis_delete_stats AFTER DELETE ON repo_analysis
+    BEGIN
+        UPDATE user_stats
+        SET analyzed_count = analyzed_count - 1,
+            code_quality_sum = code_quality_sum - IFNULL(OLD.code_quality_score, 0)
+        WHERE user_id = (SELECT user_id FROM repositories WHERE id = OLD.repo_id);
+    END
+    """
+]
+
+MIGRATIONS = [
+    (1, "baseline schema", BASELINE),
+    (2, "repositories.default_branch", [
+        add_column("repositories", "default_branch", "TEXT")
+    ]),
+    (3, "analytics indexes", [
+        # Covers /github/progress: filter + order + every selected column
+        """
+        CREATE INDEX IF NOT EXISTS idx_history_repo_created
+        ON repo_analysis_history (
+            repo_id, created_at,
+            documentation_score, code_quality_score, maintainability_score
+        )
+        """,
+        # /learning/current: newest roadmap for a user
+        """
+        CREATE INDEX IF NOT EXISTS idx_roadmaps_user_created
+        ON learning_roadmaps (user_id, created_at)
+        """,
+        # LRU eviction in the analysis cache
+        """
+        CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used
+        ON analysis_cache (last_used_at)
+        """
+    ]),
+    (4, "user_stats aggregates", USER_STATS),
+    (5, "history rollup tier", [
+        # Compacted repo_analysis_history: sums (not averages) so day rows
+        # can be merged into week rows without losing precision
+        """
+        CREATE TABLE repo_analysis_history_rollup (
+            repo_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            documentation_sum INTEGER,
+            documentation_min INTEGER,
+            documentation_max INTEGER,
+            code_quality_sum INTEGER,
+            code_quality_min INTEGER,
+            code_quality_max INTEGER,
+            maintainability_sum INTEGER,
+            maintainability_min INTEGER,
+            maintainability_max INTEGER,
+            PRIMARY KEY (repo_id, period, bucket)
+        )
+        """,
+        """
+        CREATE INDEX idx_history_rollup_repo_bucket
+        ON repo_analysis_history_rollup (repo_id, bucket)
+        """
+    ]),
+    (6, "learning_roadmaps cache columns", [
+        add_column("learning_roadmaps", "kind", "TEXT DEFAULT 'items'"),
+        add_column("learning_roadmaps", "skill_key", "TEXT"),
+        add_column("learning_roadmaps", "prompt_version", "TEXT"),
+        add_column("learning_roadmaps", "cached_at", "REAL"),
+        add_column("learning_roadmaps", "last_used_at", "REAL"),
+        """
+        CREATE INDEX idx_roadmaps_cache
+        ON learning_roadmaps (skill_key, prompt_version, cached_at)
+        """
+    ]),
+    (7, "llm_inflight single-flight table", [
+        """
+        CREATE TABLE llm_inflight (
+            request_key TEXT PRIMARY KEY,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            result_json TEXT
+        )
+        """
+    ]),
+    (8, "evaluation cache", [
+        """
+        CREATE TABLE evaluation_cache (
+            cache_key TEXT PRIMARY KEY,
+            result_json TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE INDEX idx_evaluation_cache_last_used
+        ON evaluation_cache (last_used_at)
+        """,
+        # Hit/miss totals per cache, shared by all workers
+        """
+        CREATE TABLE cache_counters (
+            name TEXT PRIMARY KEY,
+            hits INTEGER NOT NULL DEFAULT 0,
+            misses INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    ])
+]
+
+# ---------------- MAIN API ----------------
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    target = target or MIGRATIONS[-1][0]
+
+    for version, name, steps in MIGRATIONS:
+        if version > target:
+            break
+
+        # IMMEDIATE takes the write lock up front so concurrently booting
+        # workers apply each version exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+
+            conn.execute(f"PRAGMA user_version={version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"✅ DB migrated to v{version}: {name}")
+
+    return current_version(conn)
@@ -0,0 +1,92 @@
+import math
+import os
+import re
+
+# ---------------- CONSTANTS ----------------
+# Input-token budgets per model; the template itself is counted against it
+MODEL_INPUT_BUDGETS = {
+    "baidu/ernie-4.5-vl-424b-a47b": int(os.getenv("ANALYSIS_INPUT_TOKENS", 4000)),
+    "baidu/ernie-4.5-21B-a3b-thinking": int(os.getenv("LEARNING_INPUT_TOKENS", 3000)),
+}
+DEFAULT_INPUT_BUDGET = int(os.getenv("DEFAULT_INPUT_TOKENS", 3000))
+
+# Sections are split into chunks of about this many tokens; each further
+# chunk of the same section is worth DECAY times the previous one, so the
+# head of many files beats the tail of one
+CHUNK_TOKENS = 120
+DECAY = 0.5
+# Sections smaller than this carry no signal (empty __init__.py etc.)
+MIN_SECTION_TOKENS = 8
+
+TRUNCATED = "…"
+
+# Words of up to ~4 characters are one token; CJK characters are one each
+TOKEN_RE = re.compile(r"[぀-ヿ㐀-鿿]|\w+|[^\w\s]")
+
+# ---------------- TOKENS ----------------
+
+def count_tokens(text):
+    count = 0
+    for piece in TOKEN_RE.findall(text):
+        count += math.ceil(len(piece) / 4) if len(piece) > 4 else 1
+    # Newlines are usually their own token in code
+    return count + text.count("\n")
+
+
+def input_budget(model):
+    return MODEL_INPUT_BUDGETS.get(model, DEFAULT_INPUT_BUDGET)
+
+
+def chunk_lines(text):
+    chunks, current, tokens = [], [], 0
+    for line in text.splitlines():
+        line_tokens = count_tokens(line) + 1
+        if current and tokens + line_tokens > CHUNK_TOKENS:
+            chunks.append(("\n".join(current), tokens))
+            current, tokens = [], 0
+        current.append(line)
+        tokens += line_tokens
+    if current:
+        chunks.append(("\n".join(current), tokens))
+    return chunks
+
+# ---------------- PACKING ----------------
+
+def pack(sections, budget):
+    # sections: [(header, text, weight)]. Greedily takes chunks by value per
+    # token; a chunk is only taken if the one before it in the same section
+    # was, so every section is a contiguous head. Returns the framed text.
+    candidates = []
+    chunk_counts = {}
+    for s, (header, text, weight) in enumerate(sections):
+        if count_tokens(text) < MIN_SECTION_TOKENS:
+            continue
+        header_tokens = count_tokens(header) + 1
+        chunks = chunk_lines(text)
+        chunk_counts[s] = len(chunks)
+        for k, (chunk, tokens) in enumerate(chunks):
+            # The first chunk pays for its section header
+            cost = tokens + (header_tokens if k == 0 else 0)
+            candidates.append((weight * DECAY ** k / cost, s, k, chunk, cost))
+
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    taken = {}
+    left = budget
+    for _, s, k, chunk, cost in candidates:
+        if cost > left or len(taken.get(s, [])) != k:
+            continue
+        taken.setdefault(s, []).append(chunk)
+        left -= cost
+
+    parts = []
+    for s, (header, text, _) in enumerate(sections):
+        if s not in taken:
+            continue
+        body = "\n".join(taken[s])
+        if len(taken[s]) < chunk_counts[s]:
+            body += "\n" + TRUNCATED
+        parts.append(f"{header}\n{body}")
+
+    return "\n\n".join(parts)
+
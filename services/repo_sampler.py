@@ -0,0 +1,177 @@
+# Picks the files of a repository ZIP worth showing the reviewer. Ranking
+# only uses the central directory (path, size, CRC), so nothing is
+# decompressed until a file has been chosen. Scorers are plain functions
+# and can be swapped per call via select(..., scorers=[...]).
+
+import os
+from pathlib import PurePosixPath
+
+# ---------------- CONSTANTS ----------------
+MAX_SAMPLES = int(os.getenv("REPO_SAMPLE_FILES", 15))
+# Bytes of source handed to the prompt builder across all samples
+SAMPLE_BYTES = int(os.getenv("REPO_SAMPLE_BYTES", 24000))
+MAX_SAMPLE_BYTES = int(os.getenv("REPO_SAMPLE_FILE_BYTES", 4000))
+# Not worth a sample slot below this
+MIN_SAMPLE_BYTES = 200
+
+LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "kotlin",
+    ".c": "c", ".h": "c",
+    ".cpp": "cpp", ".cc": "cpp", ".hpp": "cpp",
+    ".go": "go", ".rs": "rust", ".rb": "ruby", ".php": "php",
+    ".cs": "csharp", ".swift": "swift",
+}
+
+SKIP_DIRS = {
+    "vendor", "vendors", "node_modules", "bower_components", "third_party",
+    "dist", "build", "out", "target", "coverage", "site-packages",
+    "venv", ".venv", "env", "__pycache__", ".git", ".next", ".nuxt",
+}
+GENERATED_SUFFIXES = (
+    ".min.js", ".min.css", "-min.js", ".bundle.js", ".chunk.js",
+    "_pb2.py", "_pb2_grpc.py", ".pb.go", ".generated.cs", ".d.ts",
+)
+
+ENTRYPOINTS = {
+    "main.py", "app.py", "__main__.py", "manage.py", "wsgi.py", "server.py",
+    "index.js", "index.ts", "server.js", "app.js", "main.ts",
+    "main.go", "main.rs", "lib.rs", "main.java", "main.c", "main.cpp",
+}
+TEST_DIRS = {"test", "tests", "__tests__", "spec", "specs"}
+AUX_DIRS = {"docs", "doc", "examples", "example", "samples", "scripts", "benchmarks"}
+
+# Each pick of the same language / directory scales the next one down
+LANGUAGE_DECAY = 0.6
+DIR_DECAY = 0.5
+
+# ---------------- CANDIDATES ----------------
+
+def candidate(info):
+    # GitHub archives wrap everything in "<repo>-<ref>/"
+    parts = PurePosixPath(info.filename).parts[1:]
+    if not parts:
+        return None
+
+    path = PurePosixPath(*parts)
+    language = LANGUAGES.get(path.suffix.lower())
+    if language is None:
+        return None
+
+    return {
+        "info": info,
+        "path": str(path),
+        "name": path.name.lower(),
+        "dirs": [p.lower() for p in path.parts[:-1]],
+        "dir": str(path.parent).lower(),
+        "language": language,
+        "size": info.file_size,
+        "score": 1.0,
+    }
+
+# ---------------- SCORERS ----------------
+# Each takes a candidate and returns a multiplier; 0 drops the file.
+
+def skip_vendored(c):
+    return 0.0 if SKIP_DIRS.intersection(c["dirs"]) else 1.0
+
+
+def skip_generated(c):
+    return 0.0 if c["name"].endswith(GENERATED_SUFFIXES) else 1.0
+
+
+def size_score(c):
+    # Empty __init__.py and one-liners say nothing about the code
+    if c["size"] < 64:
+        return 0.0
+    if c["size"] < 200:
+        return 0.2
+    # Very large sources are usually data tables or generated code
+    if c["size"] > 100 * 1024:
+        return 0.3
+    return 1.0
+
+
+def entrypoint_bonus(c):
+    return 2.0 if c["name"] in ENTRYPOINTS else 1.0
+
+
+def test_penalty(c):
+    name = c["name"]
+    is_test = (
+        TEST_DIRS.intersection(c["dirs"])
+        or name.startswith("test_")
+        or name.rsplit(".", 1)[0].endswith(("_test", ".test", ".spec"))
+    )
+    return 0.4 if is_test else 1.0
+
+
+def aux_penalty(c):
+    return 0.6 if AUX_DIRS.intersection(c["dirs"]) else 1.0
+
+
+def depth_penalty(c):
+    return 1.0 / (1.0 + 0.15 * len(c["dirs"]))
+
+
+SCORERS = [
+    skip_vendored,
+    skip_generated,
+    size_score,
+    entrypoint_bonus,
+    test_penalty,
+    aux_penalty,
+    depth_penalty,
+]
+
+# ---------------- SELECTION ----------------
+
+def rank(infos, scorers=SCORERS):
+    ranked = []
+    for info in infos:
+        c = candidate(info)
+        if c is None:
+            continue
+        for scorer in scorers:
+            c["score"] *= scorer(c)
+            if not c["score"]:
+                break
+        if c["score"]:
+            ranked.append(c)
+    return ranked
+
+
+def select(infos, scorers=SCORERS, max_files=MAX_SAMPLES, budget=SAMPLE_BYTES):
+    # Greedy: each round takes the best candidate after decaying scores for
+    # languages and directories already picked, within the byte budget.
+    # Identical files (same CRC and size) are only taken once.
+    candidates = rank(infos, scorers)
+    chosen, seen = [], set()
+    languages, dirs = {}, {}
+
+    while candidates and len(chosen) < max_files and budget >= MIN_SAMPLE_BYTES:
+        def effective(c):
+            return (
+                c["score"]
+                * LANGUAGE_DECAY ** languages.get(c["language"], 0)
+                * DIR_DECAY ** dirs.get(c["dir"], 0)
+            )
+
+        best = max(candidates, key=effective)
+        candidates.remove(best)
+
+        fingerprint = (best["info"].CRC, best["size"])
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        best["bytes"] = min(best["size"], MAX_SAMPLE_BYTES, budget)
+        budget -= best["bytes"]
+        chosen.append(best)
+
+        languages[best["language"]] = languages.get(best["language"], 0) + 1
+        dirs[best["dir"]] = dirs.get(best["dir"], 0) + 1
+
+    return chosen
@@ -0,0 +1,165 @@
+import json
+
+from services.github_service import sync_public_repos
+
+# ---------------- ANALYSIS ----------------
+
+UPSERT_ANALYSIS_SQL = """
+    INSERT INTO repo_analysis (
+        repo_id,
+        documentation_score,
+        code_quality_score,
+        maintainability_score,
+        developer_level,
+        strengths,
+        weaknesses,
+        improvements
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(repo_id) DO UPDATE SET
+        documentation_score=excluded.documentation_score,
+        code_quality_score=excluded.code_quality_score,
+        maintainability_score=excluded.maintainability_score,
+        developer_level=excluded.developer_level,
+        strengths=excluded.strengths,
+        weaknesses=excluded.weaknesses,
+        improvements=excluded.improvements,
+        updated_at=CURRENT_TIMESTAMP
+"""
+
+INSERT_HISTORY_SQL = """
+    INSERT INTO repo_analysis_history (
+        repo_id,
+        documentation_score,
+        code_quality_score,
+        maintainability_score,
+        developer_level
+    )
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def save_analyses(conn, items):
+    # items: [(repo_id, result), ...]; caller owns the transaction
+    conn.executemany(UPSERT_ANALYSIS_SQL, [
+        (
+            repo_id,
+            result["documentation_score"],
+            result["code_quality_score"],
+            result["maintainability_score"],
+            result["estimated_developer_level"],
+            json.dumps(result["strengths"]),
+            json.dumps(result["weaknesses"]),
+            json.dumps(result["improvement_suggestions"])
+        )
+        for repo_id, result in items
+    ])
+
+    conn.executemany(INSERT_HISTORY_SQL, [
+        (
+            repo_id,
+            result["documentation_score"],
+            result["code_quality_score"],
+            result["maintainability_score"],
+            result["estimated_developer_level"]
+        )
+        for repo_id, result in items
+    ])
+
+
+def save_analysis(conn, repo_id, result):
+    save_analyses(conn, [(repo_id, result)])
+
+# ---------------- GITHUB SYNC STATE ----------------
+
+def load_sync_validators(conn, user_id, github_username):
+    row = conn.execute("""
+        SELECT github_username, validators
+        FROM github_sync_state
+        WHERE user_id=?
+    """, (user_id,)).fetchone()
+
+    # Validators belong to one account; a reconnect starts from scratch
+    if not row or row["github_username"] != github_username:
+        return []
+    return json.loads(row["validators"] or "[]")
+
+
+def save_sync_validators(conn, user_id, github_username, validators):
+    conn.execute("""
+        INSERT INTO github_sync_state (user_id, github_username, validators, synced_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id) DO UPDATE SET
+            github_username=excluded.github_username,
+            validators=excluded.validators,
+            synced_at=excluded.synced_at
+    """, (user_id, github_username, json.dumps(validators)))
+
+
+# ---------------- REPOSITORY SYNC ----------------
+
+def sync_repositories(conn, user_id, repos):
+    # Applies the upstream repo list as one batch of writes; caller commits
+    rows = conn.execute("""
+        SELECT id, repo_url, language, default_branch
+        FROM repositories
+        WHERE user_id=?
+    """, (user_id,)).fetchall()
+    existing = {r["repo_url"]: r for r in rows}
+
+    inserted = []
+    updated = []
+    for r in repos:
+        current = existing.get(r["url"])
+        values = (r["language"], r["default_branch"], user_id, r["url"])
+        if current is None:
+            inserted.append(values)
+        elif (current["language"], current["default_branch"]) != (r["language"], r["default_branch"]):
+            updated.append(values)
+
+    upstream = {r["url"] for r in repos}
+    removed = [(r["id"],) for url, r in existing.items() if url not in upstream]
+
+    conn.executemany("""
+        INSERT INTO repositories (language, default_branch, user_id, repo_url)
+        VALUES (?, ?, ?, ?)
+    """, inserted)
+
+    conn.executemany("""
+        UPDATE repositories SET language=?, default_branch=?
+        WHERE user_id=? AND repo_url=?
+    """, updated)
+
+    # Repos that vanished upstream take their analyses with them
+    conn.executemany("DELETE FROM repo_analysis_history WHERE repo_id=?", removed)
+    conn.executemany("DELETE FROM repo_analysis_history_rollup WHERE repo_id=?", removed)
+    conn.executemany("DELETE FROM repo_analysis WHERE repo_id=?", removed)
+    conn.executemany("DELETE FROM repositories WHERE id=?", removed)
+
+    return {
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "removed": len(removed)
+    }
+
+
+def fetch_github_account(conn, user_id, github_username):
+    # Network only: runs before the caller's first write, so no SQLite
+    # write lock is held across GitHub pagination
+    validators = load_sync_validators(conn, user_id, github_username)
+    return sync_public_repos(github_username, validators)
+
+
+def apply_github_sync(conn, user_id, github_username, synced):
+    # 304 on every page => nothing to write; caller commits
+    counts = {"inserted": 0, "updated": 0, "removed": 0}
+    if not synced["not_modified"]:
+        counts = sync_repositories(conn, user_id, synced["repos"])
+
+    save_sync_validators(conn, user_id, github_username, synced["validators"])
+    return counts
+
+
+def sync_github_account(conn, user_id, github_username):
+    synced = fetch_github_account(conn, user_id, github_username)
+    return apply_github_sync(conn, user_id, github_username, synced)
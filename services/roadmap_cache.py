@@ -0,0 +1,107 @@
+import json
+import os
+import re
+import time
+
+# ---------------- CONSTANTS ----------------
+ROADMAP_CACHE_TTL_SECONDS = int(os.getenv("ROADMAP_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+ROADMAP_CACHE_MAX_KEYS = int(os.getenv("ROADMAP_CACHE_MAX_KEYS", 1000))
+
+# Spellings that should share one cached roadmap
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "cpp": "c++",
+    "c plus plus": "c++",
+    "csharp": "c#",
+    "c sharp": "c#",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "k8s": "kubernetes",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "cv": "computer vision",
+    "nlp": "natural language processing",
+    "web dev": "web development",
+    "webdev": "web development"
+}
+
+# ---------------- HELPERS ----------------
+
+def canonical_skill(skill):
+    key = re.sub(r"\s+", " ", skill.strip().lower()).strip(" .,;:!?\"'")
+    return SKILL_ALIASES.get(key, key)
+
+
+def evict(conn, now):
+    # Evicted entries keep their rows (users' history); they just stop
+    # being served as cache hits
+    conn.execute("""
+        UPDATE learning_roadmaps SET skill_key=NULL
+        WHERE skill_key IS NOT NULL AND cached_at < ?
+    """, (now - ROADMAP_CACHE_TTL_SECONDS,))
+
+    conn.execute("""
+        UPDATE learning_roadmaps SET skill_key=NULL
+        WHERE skill_key IS NOT NULL
+          AND skill_key || '|' || prompt_version NOT IN (
+              SELECT skill_key || '|' || prompt_version
+              FROM learning_roadmaps
+              WHERE skill_key IS NOT NULL
+              GROUP BY skill_key, prompt_version
+              ORDER BY MAX(last_used_at) DESC
+              LIMIT ?
+          )
+    """, (ROADMAP_CACHE_MAX_KEYS,))
+
+# ---------------- MAIN API ----------------
+
+def lookup(conn, skill_key, prompt_version):
+    now = time.time()
+    row = conn.execute("""
+        SELECT id, roadmap_json
+        FROM learning_roadmaps
+        WHERE skill_key=? AND prompt_version=? AND cached_at >= ?
+        ORDER BY cached_at DESC
+        LIMIT 1
+    """, (skill_key, prompt_version, now - ROADMAP_CACHE_TTL_SECONDS)).fetchone()
+
+    if not row:
+        return None
+
+    conn.execute(
+        "UPDATE learning_roadmaps SET last_used_at=? WHERE id=?",
+        (now, row["id"])
+    )
+    return json.loads(row["roadmap_json"])
+
+
+def save_roadmap(conn, user_id, skill, roadmap, kind, skill_key=None, prompt_version=None):
+    # With skill_key set the row also becomes the cache entry for that key;
+    # per-user copies of a cache hit are saved without one
+    now = time.time()
+    cur = conn.execute("""
+        INSERT INTO learning_roadmaps (
+            user_id, skill, roadmap_json, kind,
+            skill_key, prompt_version, cached_at, last_used_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        user_id,
+        skill,
+        json.dumps(roadmap, ensure_ascii=False),
+        kind,
+        skill_key,
+        prompt_version,
+        now if skill_key else None,
+        now if skill_key else None
+    ))
+
+    if skill_key:
+        evict(conn, now)
+    return cur.lastrowid
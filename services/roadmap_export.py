@@ -0,0 +1,75 @@
+# File export of stored learning roadmaps, for tools that still read
+# static/data/skill.json. Runs outside the request path.
+#
+#   python -m services.roadmap_export --user-id 7 [--path static/data/skill.json]
+#   python -m services.roadmap_export --roadmap-id 42 --path /tmp/roadmap.json
+#
+# The file is written to a temp file in the target directory and renamed
+# over the old one, so readers never see a partial or interleaved file.
+
+import argparse
+import json
+import os
+import tempfile
+
+from services.db import pooled
+
+# ---------------- CONSTANTS ----------------
+DEFAULT_PATH = os.getenv("ROADMAP_EXPORT_PATH", "static/data/skill.json")
+
+# ---------------- HELPERS ----------------
+
+def write_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".roadmap-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_roadmap(conn, roadmap_id=None, user_id=None):
+    if roadmap_id is not None:
+        row = conn.execute(
+            "SELECT roadmap_json FROM learning_roadmaps WHERE id=?", (roadmap_id,)
+        ).fetchone()
+    else:
+        row = conn.execute("""
+            SELECT roadmap_json
+            FROM learning_roadmaps
+            WHERE user_id=? AND IFNULL(kind, 'items') = 'items'
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        """, (user_id,)).fetchone()
+
+    return json.loads(row["roadmap_json"]) if row else None
+
+# ---------------- MAIN API ----------------
+
+def export_roadmap(path=DEFAULT_PATH, roadmap_id=None, user_id=None):
+    with pooled() as conn:
+        roadmap = load_roadmap(conn, roadmap_id, user_id)
+
+    if roadmap is None:
+        raise LookupError("Roadmap not found")
+
+    write_atomic(path, roadmap)
+    return {"path": path, "items": len(roadmap)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a stored learning roadmap to a JSON file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--roadmap-id", type=int)
+    source.add_argument("--user-id", type=int, help="latest roadmap of this user")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    print(export_roadmap(args.path, args.roadmap_id, args.user_id))
@@ -0,0 +1,148 @@
+# Turns raw model output into roadmap items. Everything goes through
+# json.JSONDecoder.raw_decode: well-formed output is decoded in one pass by
+# the C scanner, and truncated or damaged output is recovered object by
+# object from the roadmap array instead of being rescanned by regexes.
+
+import json
+import re
+
+# ---------------- CONSTANTS ----------------
+ROADMAP_ITEMS = 10
+
+# Output field -> keys the model has been seen to use for it, in priority
+# order; the first truthy one wins
+ALIASES = {
+    "title": ("title",),
+    "description": ("description",),
+    "level": ("level", "difficulty"),
+    "skills": ("skills", "skill", "technologies", "tools"),
+    "prerequisites": ("prerequisites", "requires", "depends_on"),
+    "project_list": ("project_list", "projects", "projectList"),
+}
+DEFAULTS = {
+    "title": "Untitled Topic",
+    "description": "",
+    "level": "Beginner",
+}
+LIST_FIELDS = ("skills", "prerequisites", "project_list")
+
+# Keys a wrapping object may hold the roadmap under, in priority order
+WRAPPER_KEYS = ("projects", "roadmap")
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r"[\s,]*")
+# Start of an array whose first element is an object
+_ARRAY_OF_OBJECTS = re.compile(r"\[\s*\{")
+
+# ---------------- NORMALIZATION ----------------
+
+def normalize_roadmap_item(item):
+    out = {}
+    for field, keys in ALIASES.items():
+        value = None
+        for key in keys:
+            value = item.get(key)
+            if value:
+                break
+        out[field] = value or DEFAULTS.get(field, [])
+
+    # Ensure lists
+    for field in LIST_FIELDS:
+        if isinstance(out[field], str):
+            out[field] = [out[field]]
+
+    # 🔥 Auto-generate projects if missing
+    if not out["project_list"]:
+        title = item.get("title", "Topic")
+        out["project_list"] = [
+            f"{title} – Mini Project",
+            f"{title} – Practical Implementation",
+            f"{title} – Real-World Use Case"
+        ]
+
+    return out
+
+# ---------------- DECODING ----------------
+
+def roadmap_list(parsed):
+    # Normalize into list (AUTO-DETECT)
+    if isinstance(parsed, list):
+        return parsed
+    if isinstance(parsed, dict):
+        for key in WRAPPER_KEYS:
+            if key in parsed:
+                return parsed[key]
+        for value in parsed.values():
+            if isinstance(value, list):
+                return value
+        raise ValueError("Unknown AI JSON structure")
+    raise ValueError("Unexpected AI output format")
+
+
+def decode_items(text, pos):
+    # Decodes values from an array body starting at pos until the array
+    # closes or the input stops parsing. Returns (items, end, closed).
+    items = []
+    while True:
+        pos = _SEPARATORS.match(text, pos).end()
+        if pos >= len(text):
+            return items, pos, False
+        if text[pos] == "]":
+            return items, pos + 1, True
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return items, pos, False
+        items.append(item)
+
+
+def parse_roadmap(raw):
+    # Skip markdown fences / prose: the document starts at the first bracket
+    starts = [i for i in (raw.find("["), raw.find("{")) if i >= 0]
+    if not starts:
+        raise ValueError("Invalid AI JSON")
+    start = min(starts)
+
+    try:
+        parsed, _ = _decoder.raw_decode(raw, start)
+        items = roadmap_list(parsed)
+    except json.JSONDecodeError:
+        # Truncated / damaged: keep every complete object of the roadmap array
+        match = _ARRAY_OF_OBJECTS.search(raw, start)
+        if not match:
+            raise ValueError("Invalid AI JSON")
+        items, _, _ = decode_items(raw, match.start() + 1)
+
+    return [normalize_roadmap_item(i) for i in items if isinstance(i, dict)]
+
+# ---------------- STREAMED OUTPUT ----------------
+
+class ItemStream:
+    # Fed with streamed completion text; returns each object of the roadmap
+    # array as soon as it is complete, so item 1 can be shown while the
+    # rest is still generating. Decoding is only retried once a chunk
+    # brings a closing bracket.
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None
+        self.closed = False
+
+    def feed(self, text):
+        self.buffer += text
+        if self.closed:
+            return []
+
+        if self.pos is None:
+            match = _ARRAY_OF_OBJECTS.search(self.buffer)
+            if not match:
+                return []
+            self.pos = match.start() + 1
+        elif "}" not in text and "]" not in text:
+            return []
+
+        items, self.pos, self.closed = decode_items(self.buffer, self.pos)
+        return [normalize_roadmap_item(i) for i in items if isinstance(i, dict)]
+
+    def text(self):
+        return self.buffer
@@ -0,0 +1,68 @@
+from typing import NamedTuple
+
+# ---------------- TYPES ----------------
+
+class ScoreRollup(NamedTuple):
+    repo_count: int
+    avg_documentation: float
+    avg_code_quality: float
+    avg_maintainability: float
+    overall: float
+    # language -> mean of each repo's (doc + code + maintainability) / 3
+    language_avg: dict
+    languages: list
+
+# ---------------- LABELS ----------------
+
+def resume_summary(overall):
+    return (
+        "Advanced developer" if overall >= 85
+        else "Proficient developer" if overall >= 70
+        else "Growing developer"
+    )
+
+
+def growth_label(overall):
+    return (
+        "🚀 Strong Upward Trend" if overall >= 80
+        else "📈 Steady Improvement" if overall >= 65
+        else "🌱 Learning Phase"
+    )
+
+# ---------------- MAIN API ----------------
+
+def user_rollup(conn, user_id):
+    # SQLite returns one row per language; the overall figures are the
+    # count-weighted combination of those rows
+    groups = conn.execute("""
+        SELECT r.language AS language,
+               COUNT(*) AS repo_count,
+               SUM(a.documentation_score) AS doc_sum,
+               SUM(a.code_quality_score) AS code_sum,
+               SUM(a.maintainability_score) AS main_sum,
+               AVG((a.documentation_score
+                    + a.code_quality_score
+                    + a.maintainability_score) / 3.0) AS combined_avg
+        FROM repositories r
+        JOIN repo_analysis a ON r.id = a.repo_id
+        WHERE r.user_id=?
+        GROUP BY r.language
+    """, (user_id,)).fetchall()
+
+    repo_count = sum(g["repo_count"] for g in groups)
+    if not repo_count:
+        return ScoreRollup(0, 0.0, 0.0, 0.0, 0.0, {}, [])
+
+    avg_doc = sum(g["doc_sum"] or 0 for g in groups) / repo_count
+    avg_code = sum(g["code_sum"] or 0 for g in groups) / repo_count
+    avg_main = sum(g["main_sum"] or 0 for g in groups) / repo_count
+
+    return ScoreRollup(
+        repo_count=repo_count,
+        avg_documentation=avg_doc,
+        avg_code_quality=avg_code,
+        avg_maintainability=avg_main,
+        overall=(avg_doc + avg_code + avg_main) / 3,
+        language_avg={g["language"]: round(g["combined_avg"] or 0, 1) for g in groups},
+        languages=sorted(g["language"] for g in groups if g["language"])
+    )
@@ -0,0 +1,218 @@
+# Coalesces identical in-flight LLM requests: concurrent callers with the
+# same request, byte for byte, share one upstream call and its result.
+# Threads in a process wait on the leader directly; other gunicorn workers
+# find the leader's row in llm_inflight and poll it for the result. A
+# streamed call is shared the same way: the leader streams, followers get
+# the finished text in one piece.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from services.db import pooled
+
+# ---------------- CONSTANTS ----------------
+# A finished result is handed to identical requests for this long
+RESULT_TTL_SECONDS = float(os.getenv("SINGLEFLIGHT_RESULT_TTL_SECONDS", 10))
+# A leader is presumed dead this long after its call's own deadline
+LEADER_MARGIN_SECONDS = float(os.getenv("SINGLEFLIGHT_LEADER_MARGIN_SECONDS", 30))
+POLL_INTERVAL_SECONDS = 0.25
+
+_lock = threading.Lock()
+_calls = {}
+
+# ---------------- HELPERS ----------------
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Leader's consumer went away before a result: followers retry
+        self.abandoned = False
+
+
+def make_key(request):
+    # Hashed exactly as sent: whitespace inside a prompt can be meaningful
+    # (indentation of student code), so it is never rewritten
+    raw = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def join_local(key):
+    # Returns (call, leader)
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+    return call, leader
+
+
+def leave_local(key, call):
+    with _lock:
+        _calls.pop(key, None)
+    call.done.set()
+
+# ---------------- CROSS-PROCESS ----------------
+
+def claim(key, leader_timeout):
+    # True if this process leads the call
+    now = time.time()
+    with pooled() as conn:
+        conn.execute("""
+            DELETE FROM llm_inflight
+            WHERE finished_at < ?
+               OR (finished_at IS NULL AND started_at < ?)
+        """, (now - RESULT_TTL_SECONDS, now - leader_timeout))
+        leader = conn.execute(
+            "INSERT OR IGNORE INTO llm_inflight (request_key, started_at) VALUES (?, ?)",
+            (key, now)
+        ).rowcount == 1
+        conn.commit()
+    return leader
+
+
+def publish(key, value):
+    with pooled() as conn:
+        conn.execute("""
+            UPDATE llm_inflight SET result_json=?, finished_at=?
+            WHERE request_key=?
+        """, (json.dumps(value), time.time(), key))
+        conn.commit()
+
+
+def release(key):
+    with pooled() as conn:
+        conn.execute("DELETE FROM llm_inflight WHERE request_key=?", (key,))
+        conn.commit()
+
+
+def poll(key):
+    # None: no leader (failed and cleaned up); else the llm_inflight row
+    with pooled() as conn:
+        return conn.execute(
+            "SELECT finished_at, result_json FROM llm_inflight WHERE request_key=?",
+            (key,)
+        ).fetchone()
+
+
+def across_processes(key, fn, leader_timeout):
+    if claim(key, leader_timeout):
+        try:
+            value = fn()
+        except Exception:
+            release(key)
+            raise
+        publish(key, value)
+        return value
+
+    deadline = time.time() + leader_timeout
+    while time.time() < deadline:
+        row = poll(key)
+
+        # Leader failed and cleaned up: make our own call
+        if row is None:
+            return fn()
+        if row["finished_at"] is not None:
+            return json.loads(row["result_json"])
+
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+    return fn()
+
+
+def stream_own(open_stream):
+    chunks = []
+    for text in open_stream():
+        chunks.append(text)
+        yield text
+    return "".join(chunks)
+
+
+def stream_across_processes(key, open_stream, leader_timeout):
+    # Generator; its return value is the full text
+    if claim(key, leader_timeout):
+        try:
+            value = yield from stream_own(open_stream)
+        except BaseException:
+            # Upstream error or consumer gone: let followers take over
+            release(key)
+            raise
+        publish(key, value)
+        return value
+
+    deadline = time.time() + leader_timeout
+    while time.time() < deadline:
+        row = poll(key)
+
+        # Leader failed and cleaned up: make our own call
+        if row is None:
+            break
+        if row["finished_at"] is not None:
+            value = json.loads(row["result_json"])
+            yield value
+            return value
+
+        yield ""
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+    return (yield from stream_own(open_stream))
+
+# ---------------- MAIN API ----------------
+
+def do(key, fn, deadline_seconds):
+    # deadline_seconds: the longest fn may legitimately run; followers in
+    # other workers wait that long plus a margin before taking over
+    leader_timeout = deadline_seconds + LEADER_MARGIN_SECONDS
+    call, leader = join_local(key)
+
+    if not leader:
+        call.done.wait()
+        if call.abandoned:
+            return do(key, fn, deadline_seconds)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = across_processes(key, fn, leader_timeout)
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        leave_local(key, call)
+
+    return call.result
+
+
+def stream(key, open_stream, deadline_seconds):
+    # Streamed counterpart of do(). The leader yields open_stream()'s chunks
+    # as they come; followers yield "" while waiting (so callers can keep
+    # their connection alive) and then the leader's full text as one chunk.
+    leader_timeout = deadline_seconds + LEADER_MARGIN_SECONDS
+    call, leader = join_local(key)
+
+    if not leader:
+        while not call.done.wait(POLL_INTERVAL_SECONDS):
+            yield ""
+        if call.abandoned:
+            yield from stream(key, open_stream, deadline_seconds)
+            return
+        if call.error is not None:
+            raise call.error
+        yield call.result
+        return
+
+    try:
+        call.result = yield from stream_across_processes(key, open_stream, leader_timeout)
+    except GeneratorExit:
+        call.abandoned = True
+        raise
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        leave_local(key, call)
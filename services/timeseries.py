@@ -0,0 +1,199 @@
+import os
+
+# ---------------- CONSTANTS ----------------
+# Raw series longer than this are LTTB-downsampled unless ?points= says otherwise
+MAX_POINTS = int(os.getenv("PROGRESS_MAX_POINTS", 500))
+MAX_BATCH_REPOS = 100
+
+SCORES = {
+    "documentation_score": "documentation",
+    "code_quality_score": "code_quality",
+    "maintainability_score": "maintainability"
+}
+
+# Bucket start expressions over created_at ('YYYY-MM-DD HH:MM:SS')
+BUCKETS = {
+    "day": "date(created_at)",
+    "week": "date(created_at, '-6 days', 'weekday 1')"
+}
+
+# ---------------- PARAMS ----------------
+
+def parse_params(args):
+    params = {
+        "since": args.get("since") or None,
+        "until": args.get("until") or None,
+        "bucket": args.get("bucket") or None,
+        "limit": args.get("limit", type=int),
+        "points": args.get("points", type=int)
+    }
+
+    if params["bucket"] and params["bucket"] not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    if params["limit"] is not None and params["limit"] < 1:
+        raise ValueError("limit must be positive")
+    if params["points"] is not None and params["points"] < 3:
+        raise ValueError("points must be at least 3")
+
+    return params
+
+# ---------------- DOWNSAMPLING ----------------
+
+def lttb(values, threshold):
+    # Largest-Triangle-Three-Buckets; returns the indices of the kept points
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    kept = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = values[next_start:next_end] or [values[-1]]
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(span) / len(span)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs(
+                (a - avg_x) * (values[j] - values[a])
+                - (a - j) * (avg_y - values[a])
+            )
+            if area > best_area:
+                best, best_area = j, area
+
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
+
+
+def raw_payload(rows, points):
+    if len(rows) > points:
+        combined = [
+            sum(r[col] or 0 for col in SCORES) / len(SCORES) for r in rows
+        ]
+        rows = [rows[i] for i in lttb(combined, points)]
+
+    payload = {"labels": [r["created_at"] for r in rows]}
+    for col, key in SCORES.items():
+        payload[key] = [r[col] for r in rows]
+    return payload
+
+
+def bucket_payload(rows):
+    payload = {
+        "labels": [r["bucket"] for r in rows],
+        "count": [r["n"] for r in rows],
+        "min": {},
+        "max": {}
+    }
+    for key in SCORES.values():
+        payload[key] = [round(r[f"{key}_avg"], 1) for r in rows]
+        payload["min"][key] = [r[f"{key}_min"] for r in rows]
+        payload["max"][key] = [r[f"{key}_max"] for r in rows]
+    return payload
+
+# ---------------- MAIN API ----------------
+
+def points_sql(repo_ids, since, until):
+    # Raw rows and compacted rollups as one stream of (n, sum, min, max)
+    # points; a raw row is a point with n=1
+    placeholders = ", ".join("?" for _ in repo_ids)
+    parts = []
+    args = []
+
+    for table, time_col in (
+        ("repo_analysis_history", "created_at"),
+        ("repo_analysis_history_rollup", "bucket")
+    ):
+        where = [f"repo_id IN ({placeholders})"]
+        args.extend(repo_ids)
+        if since:
+            where.append(f"{time_col} >= ?")
+            args.append(since)
+        if until:
+            where.append(f"{time_col} <= ?")
+            args.append(until)
+
+        if table == "repo_analysis_history":
+            columns = "1 AS n, " + ", ".join(
+                f"{col} AS {key}_sum, {col} AS {key}_min, {col} AS {key}_max"
+                for col, key in SCORES.items()
+            )
+        else:
+            columns = "n, " + ", ".join(
+                f"{key}_sum, {key}_min, {key}_max" for key in SCORES.values()
+            )
+
+        parts.append(f"""
+            SELECT repo_id, {time_col} AS created_at, {columns}
+            FROM {table}
+            WHERE {" AND ".join(where)}
+        """)
+
+    return " UNION ALL ".join(parts), args
+
+
+def load_series(conn, repo_ids, since=None, until=None, bucket=None, limit=None, points=None):
+    points_query, args = points_sql(repo_ids, since, until)
+
+    if bucket:
+        aggregates = ",\n".join(
+            f"SUM({key}_sum) * 1.0 / SUM(n) AS {key}_avg, "
+            f"MIN({key}_min) AS {key}_min, MAX({key}_max) AS {key}_max"
+            for key in SCORES.values()
+        )
+        order = "bucket"
+        sql = f"""
+            SELECT repo_id,
+                   {BUCKETS[bucket]} AS bucket,
+                   SUM(n) AS n,
+                   {aggregates}
+            FROM ({points_query})
+            GROUP BY repo_id, bucket
+        """
+    else:
+        # Rollup points are shown at their mean
+        columns = ", ".join(
+            f"CASE WHEN n = 1 THEN {key}_sum ELSE ROUND({key}_sum * 1.0 / n, 1) END AS {col}"
+            for col, key in SCORES.items()
+        )
+        order = "created_at"
+        sql = f"""
+            SELECT repo_id, created_at, {columns}
+            FROM ({points_query})
+        """
+
+    # limit keeps the newest N rows (or buckets) per repo
+    if limit:
+        sql = f"""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY repo_id ORDER BY {order} DESC
+                ) AS rn
+                FROM ({sql})
+            )
+            WHERE rn <= ?
+        """
+        args.append(limit)
+
+    sql += f" ORDER BY repo_id, {order}"
+
+    grouped = {repo_id: [] for repo_id in repo_ids}
+    for row in conn.execute(sql, args):
+        grouped[row["repo_id"]].append(row)
+
+    if bucket:
+        return {repo_id: bucket_payload(rows) for repo_id, rows in grouped.items()}
+    return {
+        repo_id: raw_payload(rows, points or MAX_POINTS)
+        for repo_id, rows in grouped.items()
+    }